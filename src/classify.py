@@ -1,5 +1,7 @@
-from fnmatch import fnmatch
-from typing import Any, Dict, Iterable
+from fnmatch import translate
+from functools import lru_cache
+import re
+from typing import Any, Dict
 from urllib.parse import urlparse
 
 
@@ -14,7 +16,7 @@ DEFAULT_CLASSIFICATION_RULE_SPECS = (
 
 def classify_origin_host(url: str) -> str:
 	"""Return the hostname for a media URL (or empty string when missing)."""
-	return urlparse(url).hostname or ""
+	return _host_of(url)
 
 
 def classify_origin_group(host: str, config: Any | None = None) -> str:
@@ -27,7 +29,7 @@ def classify_account_host(status: Dict[str, Any]) -> str:
 	url = status.get("url")
 	if not url:
 		return "unknown"
-	return urlparse(url).hostname or "unknown"
+	return _host_of(url) or "unknown"
 
 
 def classify_account_group(host: str, config: Any | None = None) -> str:
@@ -35,34 +37,187 @@ def classify_account_group(host: str, config: Any | None = None) -> str:
 	return _classify_host(host, config)
 
 
+_lower = lru_cache(maxsize=4096)(str.lower)
+
+
+@lru_cache(maxsize=8192)
+def _host_of(url: str) -> str:
+	"""Extract the hostname from a URL; memoized since hosts repeat a lot."""
+	if url.startswith("https://"):
+		start = 8
+	elif url.startswith("http://"):
+		start = 7
+	else:
+		return urlparse(url).hostname or ""
+
+	# Plain http(s) URLs only need a slice up to the path/query/fragment.
+	end = len(url)
+	for sep in "/?#":
+		idx = url.find(sep, start, end)
+		if idx != -1:
+			end = idx
+	netloc = url[start:end]
+	if any(ch in netloc for ch in "[%\t\r\n"):
+		# IPv6 literals, zone IDs and control characters need urlparse's handling.
+		return urlparse(url).hostname or ""
+
+	host = netloc.rpartition("@")[2].partition(":")[0]
+	return host.lower()
+
+
 def _classify_host(host: str | None, config: Any | None) -> str:
 	if not host:
 		return "other"
 
-	host_lower = host.lower()
-	for match, group in _iter_rules(config):
-		if match and fnmatch(host_lower, match):
-			return group
+	if config is None:
+		matcher = _DEFAULT_COMPILED
+	else:
+		matcher = _matcher_for(_iter_rules(config))
+	return matcher.match(_lower(host)) or "other"
+
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+class _RuleMatcher:
+	"""
+	First-match-wins lookup over glob rules.
+
+	Literal hosts and "*.suffix" rules are indexed in dicts so they cost
+	O(len(host)) regardless of how many there are; the remaining globs share
+	one regex alternation. The lowest matching rule index wins. Results are
+	memoized per host, since the same few hosts repeat across bookmarks.
+	"""
+
+	__slots__ = ("groups", "exact", "suffixes", "pattern", "pattern_rules", "results")
+
+	def __init__(self, rules: tuple[tuple[str, str], ...]):
+		self.groups = tuple(group for _, group in rules)
+		self.exact: dict[str, int] = {}
+		self.suffixes: dict[str, int] = {}
+		pattern_rules = []
+		for index, (match, _) in enumerate(rules):
+			if not _GLOB_CHARS.intersection(match):
+				self.exact.setdefault(match, index)
+			elif match.startswith("*.") and not _GLOB_CHARS.intersection(match[2:]):
+				self.suffixes.setdefault(match[1:], index)
+			else:
+				pattern_rules.append(index)
+
+		# Each regex rule is a capturing group, so `lastindex` identifies the
+		# first one that matched (alternatives are tried in order).
+		self.pattern_rules = tuple(pattern_rules)
+		self.pattern = None
+		if pattern_rules:
+			source = "|".join(f"({translate(rules[i][0])})" for i in pattern_rules)
+			self.pattern = re.compile(source)
+		self.results: dict[str, str | None] = {}
+
+	def match(self, host: str) -> str | None:
+		"""Return the group of the first rule matching a lowercased host."""
+		try:
+			return self.results[host]
+		except KeyError:
+			pass
+		group = self._match(host)
+		if len(self.results) >= _MATCH_CACHE_SIZE:
+			self.results.clear()
+		self.results[host] = group
+		return group
+
+	def _match(self, host: str) -> str | None:
+		best = self.exact.get(host, len(self.groups))
+		if self.suffixes:
+			dot = host.find(".")
+			while dot != -1:
+				index = self.suffixes.get(host[dot:])
+				if index is not None and index < best:
+					best = index
+				dot = host.find(".", dot + 1)
+		if self.pattern is not None:
+			m = self.pattern.match(host)
+			if m is not None:
+				best = min(best, self.pattern_rules[m.lastindex - 1])
+		if best < len(self.groups):
+			return self.groups[best]
+		return None
+
+
+# Hosts remembered per matcher before its result cache is reset.
+_MATCH_CACHE_SIZE = 4096
+
+
+def _matcher_for(rules: tuple[tuple[str, str], ...]) -> _RuleMatcher:
+	"""
+	Return the matcher for a rules tuple. The materialized rules on a loaded
+	config are the same object on every call, so they are found by identity
+	instead of hashing every rule again.
+	"""
+	entry = _MATCHERS_BY_ID.get(id(rules))
+	if entry is not None and entry[0] is rules:
+		return entry[1]
+	matcher = _compile_rules(rules)
+	if len(_MATCHERS_BY_ID) >= 32:
+		_MATCHERS_BY_ID.clear()
+	# Keeping the tuple alive guarantees its id is not reused while cached.
+	_MATCHERS_BY_ID[id(rules)] = (rules, matcher)
+	return matcher
+
+
+_MATCHERS_BY_ID: dict[int, tuple[tuple[tuple[str, str], ...], "_RuleMatcher"]] = {}
+
+
+@lru_cache(maxsize=32)
+def _compile_rules(rules: tuple[tuple[str, str], ...]) -> _RuleMatcher:
+	"""Build (and cache) a matcher for lowercased (match, group) rules."""
+	return _RuleMatcher(tuple((match.lower(), group) for match, group in rules if match))
+
+
+# Built-in rules, lowercased and compiled once at import time.
+_DEFAULT_RULES = tuple(
+	(spec["match"].lower(), spec["group"])
+	for spec in DEFAULT_CLASSIFICATION_RULE_SPECS
+)
+_DEFAULT_COMPILED = _compile_rules(_DEFAULT_RULES)
+
 
-	return "other"
+def materialize_rules(config: Any | None) -> tuple[tuple[str, str], ...]:
+	"""
+	Snapshot classification rules as (match, group) pairs.
+	ClassificationConfig.refresh_rules stores the result on the config so
+	lookups skip rule parsing. Always reads `rules`, never the old snapshot.
+	"""
+	if config is not None:
+		return _collect_rules(getattr(config, "classify", config))
+	return _DEFAULT_RULES
 
 
-def _iter_rules(config: Any | None) -> Iterable[tuple[str, str]]:
+def _iter_rules(config: Any | None) -> tuple[tuple[str, str], ...]:
 	if config is not None:
 		classify_cfg = getattr(config, "classify", config)
-		rules = getattr(classify_cfg, "rules", None)
-		if rules:
-			for rule in rules:
-				match = getattr(rule, "match", None)
-				group = getattr(rule, "group", None)
-				if (match is None or group is None) and isinstance(rule, dict):
-					if match is None:
-						match = rule.get("match")
-					if group is None:
-						group = rule.get("group")
-				if match and group:
-					yield str(match).lower(), str(group)
-			return
-
-	for spec in DEFAULT_CLASSIFICATION_RULE_SPECS:
-		yield spec["match"].lower(), spec["group"]
+		materialized = getattr(classify_cfg, "materialized_rules", None)
+		if materialized is not None:
+			return materialized
+		return _collect_rules(classify_cfg)
+
+	return _DEFAULT_RULES
+
+
+def _collect_rules(classify_cfg: Any) -> tuple[tuple[str, str], ...]:
+	"""Read (match, group) pairs from rule objects or dicts; defaults if none."""
+	rules = getattr(classify_cfg, "rules", None)
+	if rules:
+		collected = []
+		for rule in rules:
+			match = getattr(rule, "match", None)
+			group = getattr(rule, "group", None)
+			if (match is None or group is None) and isinstance(rule, dict):
+				if match is None:
+					match = rule.get("match")
+				if group is None:
+					group = rule.get("group")
+			if match and group:
+				collected.append((str(match), str(group)))
+		return tuple(collected)
+
+	return _DEFAULT_RULES
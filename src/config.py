@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
 import re
 import yaml
 
+try:
+	from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+	from yaml import SafeLoader as _YamlLoader
+
 from humanfriendly import parse_timespan
-from classify import DEFAULT_CLASSIFICATION_RULE_SPECS
+from classify import DEFAULT_CLASSIFICATION_RULE_SPECS, materialize_rules
 
 
 _RATE_PATTERN = re.compile(
@@ -18,6 +24,7 @@ DEFAULT_USER_AGENT = "gataku/1.0 (+https://github.com/mntone/gataku)"
 _OFF_SENTINELS = {"off"}  # extendable if more disable keywords are introduced
 
 
+@lru_cache(maxsize=256)
 def _ensure_quantity_expression(expr: str) -> str:
 	"""Add a default quantity when a human-friendly duration is missing one."""
 	expr = expr.strip()
@@ -28,6 +35,22 @@ def _ensure_quantity_expression(expr: str) -> str:
 	return f"1 {expr}"
 
 
+@lru_cache(maxsize=256)
+def _parse_rate_expression(text: str) -> tuple[float, float] | None:
+	"""
+	Split a rate expression like "2/minute" into (count, period_seconds).
+	Returns None when the text is not a rate expression.
+	"""
+	match = _RATE_PATTERN.match(text)
+	if not match:
+		return None
+	count = float(match.group("count"))
+	if count <= 0:
+		raise ValueError("rate count must be positive")
+	period_expr = _ensure_quantity_expression(match.group("period"))
+	return count, parse_timespan(period_expr)
+
+
 def _parse_delay_value(value: str | int | float) -> float:
 	"""
 	Parse a human-friendly delay specification.
@@ -43,22 +66,24 @@ def _parse_delay_value(value: str | int | float) -> float:
 		return float(value)
 
 	if isinstance(value, str):
-		text = value.strip()
-		if not text:
-			raise ValueError("empty delay string")
+		return _parse_delay_text(value)
 
-		match = _RATE_PATTERN.match(text)
-		if match:
-			count = float(match.group("count"))
-			if count <= 0:
-				raise ValueError("rate count must be positive")
-			period_expr = _ensure_quantity_expression(match.group("period"))
-			period_seconds = parse_timespan(period_expr)
-			return period_seconds / count
+	raise TypeError(f"Unsupported delay value type: {type(value)!r}")
 
-		return parse_timespan(_ensure_quantity_expression(text))
 
-	raise TypeError(f"Unsupported delay value type: {type(value)!r}")
+@lru_cache(maxsize=256)
+def _parse_delay_text(value: str) -> float:
+	"""String branch of _parse_delay_value, memoized per distinct string."""
+	text = value.strip()
+	if not text:
+		raise ValueError("empty delay string")
+
+	rate = _parse_rate_expression(text)
+	if rate is not None:
+		count, period_seconds = rate
+		return period_seconds / count
+
+	return parse_timespan(_ensure_quantity_expression(text))
 
 
 def _parse_optional_delay(value) -> float | None:
@@ -101,32 +126,39 @@ def _parse_rate_per_minute(value: str | int | float) -> float:
 		return val
 
 	if isinstance(value, str):
-		text = value.strip()
-		if not text:
-			raise ValueError("empty rate string")
-
-		match = _RATE_PATTERN.match(text)
-		if match:
-			count = float(match.group("count"))
-			if count <= 0:
-				raise ValueError("rate count must be positive")
-			period_expr = _ensure_quantity_expression(match.group("period"))
-			period_seconds = parse_timespan(period_expr)
-			if period_seconds <= 0:
-				raise ValueError("period must be positive")
-			per_second = count / period_seconds
-			return per_second * 60.0
-
-		return _parse_rate_per_minute(float(text))
+		return _parse_rate_text(value)
 
 	raise TypeError(f"Unsupported rate value type: {type(value)!r}")
 
 
+@lru_cache(maxsize=256)
+def _parse_rate_text(value: str) -> float:
+	"""String branch of _parse_rate_per_minute, memoized per distinct string."""
+	text = value.strip()
+	if not text:
+		raise ValueError("empty rate string")
+
+	rate = _parse_rate_expression(text)
+	if rate is not None:
+		count, period_seconds = rate
+		if period_seconds <= 0:
+			raise ValueError("period must be positive")
+		per_second = count / period_seconds
+		return per_second * 60.0
+
+	return _parse_rate_per_minute(float(text))
+
+
+def _rate_to_delay(posts_per_minute: float) -> float:
+	"""Convert a posts-per-minute rate into seconds between posts."""
+	return 60.0 / max(posts_per_minute, 0.01)
+
+
 ###############################################################################
 # Per-instance configuration
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class InstanceConfig:
 	"""
 	A Mastodon/Misskey instance to fetch bookmarks from.
@@ -141,15 +173,27 @@ class InstanceConfig:
 	# optional override post actions
 	unbookmark_override: bool | None = None
 
-	# optional override rate limit (posts/minute)
-	rate_override: float | None = None
+	# optional override delay between posts, derived from the posts/minute rate
+	delay_seconds_override: float | None = None
+
+	@property
+	def handle_target(self) -> str | None:
+		"""account_handle without "@" and lowercased, for skip_self matching."""
+		handle = self.account_handle
+		return _handle_target(handle) if handle else None
+
+
+@lru_cache(maxsize=64)
+def _handle_target(handle: str) -> str:
+	"""Normalize an account handle for skip_self matching (memoized)."""
+	return handle.lstrip("@").lower()
 
 
 ###############################################################################
 # Path configuration
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class PathConfig:
 	download: Path = Path("data")
 	logs: Path = Path("logs")
@@ -159,11 +203,23 @@ class PathConfig:
 	removed_log_file: Path = Path("removed.jsonl")
 
 
+###############################################################################
+# Hash database
+###############################################################################
+
+HASHDB_BACKENDS = ("jsonl", "sqlite")
+
+
+@dataclass(slots=True)
+class HashDBConfig:
+	backend: str = "jsonl"              # jsonl / sqlite (see HASHDB_BACKENDS)
+
+
 ###############################################################################
 # Rate limit config
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class RateLimitConfig:
 	delay_seconds: float = 30.0         # seconds per post
 	burst_allowed: bool = False         # allow bursts or strict spacing
@@ -174,15 +230,14 @@ class RateLimitConfig:
 		The override can be specified using the same syntax accepted by
 		`_parse_rate_per_minute`.
 		"""
-		ppm = _parse_rate_per_minute(value)
-		self.delay_seconds = 60.0 / max(ppm, 0.01)
+		self.delay_seconds = _rate_to_delay(_parse_rate_per_minute(value))
 
 
 ###############################################################################
 # Download config
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class ContentFilterConfig:
 	include_audio: bool = False
 	include_gifv: bool = False
@@ -192,13 +247,28 @@ class ContentFilterConfig:
 	include_thumbnail_only: bool = False
 	include_video: bool = False
 
-@dataclass
+# `download.includes` keys mapped to ContentFilterConfig fields
+_INCLUDES_ALIAS = {
+	"gifv": "include_gifv",
+	"video": "include_video",
+	"audio": "include_audio",
+	"thumbnail_only": "include_thumbnail_only",
+	"self": "include_self",
+	"nsfw": "include_nsfw",
+	"try_unknown": "try_unknown_media",
+}
+_FILTER_FIELDS = frozenset(f.name for f in fields(ContentFilterConfig))
+
+@dataclass(slots=True)
 class DownloadRetryConfig:
 	max_attempts: int = 3
 	delay_seconds: float = 2.0
 	rate_control: bool = True
 
-@dataclass
+HASH_ALGORITHMS = ("sha256", "blake3")
+
+
+@dataclass(slots=True)
 class DownloadConfig:
 	filename_pattern: str = "{origin_group}/{yearmonth}/{screenname}-{datetime}-{index}.{ext}"
 	progress_level: str = "off"        # off / count / filesize
@@ -206,13 +276,15 @@ class DownloadConfig:
 	rate: RateLimitConfig = field(default_factory=RateLimitConfig)
 	retry: DownloadRetryConfig = field(default_factory=DownloadRetryConfig)
 	user_agent: str = DEFAULT_USER_AGENT
+	concurrency: int = 1                # parallel downloads per post
+	hash_algorithm: str = "sha256"      # sha256 / blake3 (see HASH_ALGORITHMS)
 
 
 ###############################################################################
 # Archive policy (duplicate handling)
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class ArchivePolicyConfig:
 	enabled: bool = True                # archive files instead of deleting
 	policy: str = "keep_old"            # keep_old / latest / database
@@ -223,7 +295,7 @@ class ArchivePolicyConfig:
 # Logging config
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class LoggingConfig:
 	frequency: str = "month"
 	filename_pattern: str | None = None
@@ -235,7 +307,7 @@ class LoggingConfig:
 # Removed media handling
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class RemovedLogConfig:
 	skip_media_not_found_for: float | None = None
 
@@ -244,7 +316,7 @@ class RemovedLogConfig:
 # Runtime flags
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class RuntimeConfig:
 	dry_run: bool = False
 	limit: int | None = None
@@ -256,7 +328,7 @@ class RuntimeConfig:
 # Classification config
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class ClassificationRule:
 	match: str
 	group: str
@@ -269,9 +341,16 @@ def _default_classification_rules():
 	]
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassificationConfig:
 	rules: list[ClassificationRule] = field(default_factory=_default_classification_rules)
+	# (match, group) pairs snapshot of `rules`, filled in by load_config;
+	# classification reads only this, so call refresh_rules() after edits
+	materialized_rules: tuple[tuple[str, str], ...] | None = field(default=None, repr=False, compare=False)
+
+	def refresh_rules(self) -> None:
+		"""Re-snapshot `rules` after they were replaced or edited in place."""
+		self.materialized_rules = materialize_rules(self)
 
 
 def _parse_classification_rules(value) -> list[ClassificationRule]:
@@ -309,9 +388,10 @@ def _parse_classification_rules(value) -> list[ClassificationRule]:
 # Global config root
 ###############################################################################
 
-@dataclass
+@dataclass(slots=True)
 class GlobalConfig:
 	paths: PathConfig = field(default_factory=PathConfig)
+	hashdb: HashDBConfig = field(default_factory=HashDBConfig)
 	download: DownloadConfig = field(default_factory=DownloadConfig)
 	filter: ContentFilterConfig = field(default_factory=ContentFilterConfig)
 	archive: ArchivePolicyConfig = field(default_factory=ArchivePolicyConfig)
@@ -326,6 +406,25 @@ class GlobalConfig:
 	config_file: Path | None = None
 
 
+def _parse_instance(entry: dict) -> InstanceConfig:
+	"""Build an InstanceConfig from one `instances` entry of the YAML file."""
+	unbookmark_override = entry.get("unbookmark_override", entry.get("unbookmark"))
+	post_rate = entry.get("rate_override", entry.get("rate"))
+	delay_override = None
+	if post_rate is not None:
+		delay_override = _rate_to_delay(_parse_rate_per_minute(post_rate))
+
+	return InstanceConfig(
+		name=entry["name"],
+		base_url=entry["base_url"],
+		access_token=entry["access_token"],
+		account_id=entry.get("account_id"),
+		account_handle=entry.get("account_handle") or entry.get("account_screen_name"),
+		unbookmark_override=unbookmark_override,
+		delay_seconds_override=delay_override,
+	)
+
+
 ###############################################################################
 # Loader
 ###############################################################################
@@ -343,7 +442,7 @@ def load_config(path: str | Path) -> GlobalConfig:
 		raise FileNotFoundError(f"Config file not found: {p}")
 
 	with p.open("r", encoding="utf-8") as f:
-		raw = yaml.safe_load(f) or {}
+		raw = yaml.load(f, Loader=_YamlLoader) or {}
 
 	cfg = GlobalConfig()
 	cfg.config_file = p
@@ -359,6 +458,14 @@ def load_config(path: str | Path) -> GlobalConfig:
 		if "removed_log_file" in r:
 			cfg.paths.removed_log_file = Path(r["removed_log_file"])
 
+	# --- hashdb -------------------------------------------------------
+	if "hashdb" in raw:
+		r = raw["hashdb"]
+		backend = str(r.get("backend", cfg.hashdb.backend)).lower()
+		if backend not in HASHDB_BACKENDS:
+			raise ValueError(f"hashdb.backend must be one of: {', '.join(HASHDB_BACKENDS)}")
+		cfg.hashdb.backend = backend
+
 	# --- download -----------------------------------------------------
 	if "download" in raw:
 		r = raw["download"]
@@ -369,6 +476,16 @@ def load_config(path: str | Path) -> GlobalConfig:
 		cfg.download.progress_level = r.get("progress", cfg.download.progress_level)
 		if "useragent" in r:
 			cfg.download.user_agent = r["useragent"]
+		if "concurrency" in r:
+			concurrency = int(r["concurrency"])
+			if concurrency < 1:
+				raise ValueError("download.concurrency must be at least 1")
+			cfg.download.concurrency = concurrency
+		if "hash_algorithm" in r:
+			algorithm = str(r["hash_algorithm"]).lower()
+			if algorithm not in HASH_ALGORITHMS:
+				raise ValueError(f"download.hash_algorithm must be one of: {', '.join(HASH_ALGORITHMS)}")
+			cfg.download.hash_algorithm = algorithm
 
 		if "retry" in r:
 			rr = r["retry"]
@@ -400,26 +517,16 @@ def load_config(path: str | Path) -> GlobalConfig:
 				if delay_value is not None:
 					cfg.download.rate.delay_seconds = _parse_delay_value(delay_value)
 				elif rate_value is not None:
-					ppm = _parse_rate_per_minute(rate_value)
-					cfg.download.rate.delay_seconds = 60.0 / max(ppm, 0.01)
+					cfg.download.rate.delay_seconds = _rate_to_delay(_parse_rate_per_minute(rate_value))
 			else:
 				cfg.download.rate.delay_seconds = _parse_delay_value(raw_rate)
 
 		if "includes" in r:
 			includes = r["includes"]
 			if isinstance(includes, dict):
-				alias_map = {
-					"gifv": "include_gifv",
-					"video": "include_video",
-					"audio": "include_audio",
-					"thumbnail_only": "include_thumbnail_only",
-					"self": "include_self",
-					"nsfw": "include_nsfw",
-					"try_unknown": "try_unknown_media",
-				}
 				for key, val in includes.items():
-					attr = alias_map.get(key, key)
-					if attr in vars(cfg.download.filter):
+					attr = _INCLUDES_ALIAS.get(key, key)
+					if attr in _FILTER_FIELDS:
 						setattr(cfg.download.filter, attr, val)
 
 	# --- archive policy ------------------------------------------------
@@ -455,41 +562,14 @@ def load_config(path: str | Path) -> GlobalConfig:
 
 	# --- instances ----------------------------------------------------
 	if "instances" in raw:
-		insts = []
-		for entry in raw["instances"]:
-			unbookmark_override = None
-			if "unbookmark_override" in entry:
-				unbookmark_override = entry["unbookmark_override"]
-			elif "unbookmark" in entry:
-				unbookmark_override = entry["unbookmark"]
-
-			post_rate = None
-			if "rate_override" in entry:
-				post_rate = entry["rate_override"]
-			elif "rate" in entry:
-				post_rate = entry["rate"]
-
-			if post_rate is not None:
-				post_rate = _parse_rate_per_minute(post_rate)
-
-			insts.append(
-				InstanceConfig(
-					name=entry["name"],
-					base_url=entry["base_url"],
-					access_token=entry["access_token"],
-					account_id=entry.get("account_id"),
-					account_handle=entry.get("account_handle") or entry.get("account_screen_name"),
-					unbookmark_override=unbookmark_override,
-					rate_override=post_rate,
-				)
-			)
-		cfg.instances = insts
+		cfg.instances = [_parse_instance(entry) for entry in raw["instances"]]
 
 	# --- classify rules -----------------------------------------------
 	if "classify" in raw:
 		rules = _parse_classification_rules(raw["classify"])
 		if rules:
 			cfg.classify.rules = rules
+	cfg.classify.refresh_rules()
 
 	return cfg
 
@@ -1,110 +1,248 @@
+from functools import lru_cache
 import hashlib
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import tempfile
 from typing import Tuple
 import sys
+import threading
+
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+	import blake3
+except ImportError:  # optional dependency (download.hash_algorithm: blake3)
+	blake3 = None
 
 from config import GlobalConfig
 
 
-def download_and_sha256(url: str, config: GlobalConfig, progress_label: str | None = None) -> Tuple[str, str, int]:
+# Large reads amortize per-call overhead in hashlib (OpenSSL) and file I/O.
+_CHUNK_SIZE = 1 << 18
+
+# Minimum seconds between progress line redraws (final line is always shown).
+_PROGRESS_INTERVAL = 0.1
+
+_BYTE_UNITS = ("B", "KB", "MB", "GB")
+
+# Per-thread read buffers, reused across downloads (see download.concurrency).
+_BUFFERS = threading.local()
+
+# Errors raised while streaming the body, after urllib3 retries are over.
+_STREAM_ERRORS = (
+	requests.exceptions.ChunkedEncodingError,
+	requests.exceptions.ContentDecodingError,
+	ProtocolError,
+	ReadTimeoutError,
+	DecodeError,
+)
+
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Digest prefixes keep hashes of different algorithms apart in the hash DB.
+_BLAKE3_PREFIX = "b3-"
+
+
+class _FixedDelayRetry(Retry):
+	"""urllib3 retry policy that waits a constant delay between attempts."""
+
+	def get_backoff_time(self) -> float:
+		return self.backoff_factor
+
+
+@lru_cache(maxsize=4)
+def _get_session(max_attempts: int, retry_delay: float) -> requests.Session:
 	"""
-	Download a file with retries and compute its SHA256 hash.
-	Returns (tmpfile_path, sha256_hex, size_bytes).
+	Return a pooled session whose adapter retries connection errors and
+	transient HTTP statuses (honoring Retry-After) for the given policy.
+	"""
+	retry = _FixedDelayRetry(
+		total=max(max_attempts - 1, 0),
+		backoff_factor=retry_delay,
+		status_forcelist=_RETRY_STATUSES,
+		respect_retry_after_header=True,
+		raise_on_status=False,
+	)
+	session = requests.Session()
+	for prefix in ("https://", "http://"):
+		session.mount(prefix, HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retry))
+	return session
+
+
+def _retry_delay(config: GlobalConfig) -> float:
+	"""Delay between retries: the rate-control delay or the retry delay."""
+	if config.download.retry.rate_control:
+		return config.download.rate.delay_seconds
+	return config.download.retry.delay_seconds
+
+
+def download_and_sha256(url: str, config: GlobalConfig, progress_label: str | None = None) -> Tuple[str, str, int]:
 	"""
+	Download a file with retries and compute its content hash.
+	Returns (tmpfile_path, hash_hex, size_bytes); the hash is SHA256, or
+	"b3-" + BLAKE3 when download.hash_algorithm is blake3.
 
-	attempts = config.download.retry.max_attempts
+	Connection errors and transient statuses are retried by the session
+	adapter; only interruptions while streaming the body are retried here.
+	"""
 
-	last_exc: Exception | None = None
+	attempts = max(config.download.retry.max_attempts, 1)
 
 	for i in range(attempts):
 		try:
 			return _attempt_download(url, config, progress_label)
-		except Exception as e:
-			last_exc = e
+		except _STREAM_ERRORS:
 			# Give up immediately if this was the final attempt.
 			if i + 1 >= attempts:
 				raise
-
-			# Sleep according to rate control or the retry delay.
-			if config.download.retry.rate_control:
-				time.sleep(config.download.rate.delay_seconds)
-			else:
-				time.sleep(config.download.retry.delay_seconds)
+			time.sleep(_retry_delay(config))
 
 	# This is normally unreachable because we either return or raise before here.
-	if last_exc:
-		raise last_exc
 	raise RuntimeError("download failed unexpectedly")
 
 
 def _attempt_download(url: str, cfg: GlobalConfig, progress_label: str | None) -> Tuple[str, str, int]:
 	"""Stream a single HTTP download to a temp file, returning path/hash/size."""
-	r = requests.get(url, stream=True, timeout=15, headers={"User-Agent": cfg.download.user_agent})
-	r.raise_for_status()
-
-	hasher = hashlib.sha256()
+	session = _get_session(cfg.download.retry.max_attempts, _retry_delay(cfg))
+	r = session.get(url, stream=True, timeout=15, headers={"User-Agent": cfg.download.user_agent})
+	try:
+		r.raise_for_status()
+		return _stream_to_tempfile(r, cfg, progress_label)
+	finally:
+		# Hand the pooled connection back on success, HTTP errors and
+		# interrupted streams alike.
+		r.close()
+
+
+def _stream_to_tempfile(r: requests.Response, cfg: GlobalConfig, progress_label: str | None) -> Tuple[str, str, int]:
+	"""Write a streamed response body to a temp file, returning path/hash/size."""
+	algorithm = cfg.download.hash_algorithm
+	hasher = _new_hasher(algorithm)
 	size = 0
 
 	tmp = tempfile.NamedTemporaryFile(delete=False)
 	tmp_path = tmp.name
 
-	with tmp as f:
-		downloaded = 0
-		total = int(r.headers.get("content-length") or 0)
-		show_size = (
-			progress_label is not None
-			and (cfg.download.progress_level or "off").lower() == "filesize"
-		)
-		last_len = 0
-		for chunk in r.iter_content(8192):
-			if not chunk:
-				continue
-			hasher.update(chunk)
-			size += len(chunk)
-			downloaded += len(chunk)
-			f.write(chunk)
+	# Read from the urllib3 stream into a reusable buffer, which avoids the
+	# iter_content generator and any b"".join of chunks. urllib3 still reads
+	# each chunk into its own bytes object and copies it into the buffer.
+	# Each chunk is hashed and written from the buffer in the same pass.
+	# readinto with decode_content needs urllib3 2.x (see requirements.txt).
+	raw = r.raw
+	raw.decode_content = True
+	view = _read_buffer()
+
+	try:
+		with tmp as f:
+			fd = f.fileno()
+			total = int(r.headers.get("content-length") or 0)
+			preallocated = _preallocate(fd, total, r.headers)
+			show_size = (
+				progress_label is not None
+				and (cfg.download.progress_level or "off").lower() == "filesize"
+			)
+			last_len = 0
+			total_text = _format_bytes(total) if total > 0 else ""
+			next_update = time.monotonic()
+			while True:
+				n = raw.readinto(view)
+				if not n:
+					break
+				chunk = view[:n]
+				hasher.update(chunk)
+				_write_all(fd, chunk)
+				size += n
+				if show_size:
+					now = time.monotonic()
+					if now < next_update:
+						continue
+					next_update = now + _PROGRESS_INTERVAL
+					if total > 0:
+						percent = min(size / total, 1.0) * 100
+						line = (
+							f"{progress_label} "
+							f"{_format_bytes(size)}/{total_text} "
+							f"({percent:.1f}%)"
+						)
+					else:
+						line = f"{progress_label} {_format_bytes(size)}"
+					padding = " " * max(last_len - len(line), 0)
+					sys.stdout.write("\r" + line + padding)
+					sys.stdout.flush()
+					last_len = len(line)
+			if preallocated and size != total:
+				# The body was shorter than announced; drop the unused tail.
+				os.ftruncate(fd, size)
 			if show_size:
 				if total > 0:
-					percent = min(downloaded / total, 1.0) * 100
-					line = (
-						f"{progress_label} "
-						f"{_format_bytes(downloaded)}/{_format_bytes(total)} "
-						f"({percent:.1f}%)"
-					)
+					final = f"{progress_label} {total_text}/{total_text} (100.0%)"
 				else:
-					line = f"{progress_label} {_format_bytes(downloaded)}"
-				padding = " " * max(last_len - len(line), 0)
-				sys.stdout.write("\r" + line + padding)
+					final = f"{progress_label} {_format_bytes(size)} (done)"
+				padding = " " * max(last_len - len(final), 0)
+				sys.stdout.write("\r" + final + padding + "\n")
 				sys.stdout.flush()
-				last_len = len(line)
-		if show_size:
-			if total > 0:
-				final = (
-					f"{progress_label} "
-					f"{_format_bytes(total)}/{_format_bytes(total)} (100.0%)"
-				)
-			else:
-				final = f"{progress_label} {_format_bytes(downloaded)} (done)"
-			padding = " " * max(last_len - len(final), 0)
-			sys.stdout.write("\r" + final + padding + "\n")
-			sys.stdout.flush()
-
-	return tmp_path, hasher.hexdigest(), size
+	except BaseException:
+		# Do not leave partial (possibly preallocated) temp files behind.
+		os.unlink(tmp_path)
+		raise
+
+	digest = hasher.hexdigest()
+	if algorithm == "blake3":
+		digest = _BLAKE3_PREFIX + digest
+	return tmp_path, digest, size
+
+
+def _new_hasher(algorithm: str):
+	"""Create the content hasher selected by download.hash_algorithm."""
+	if algorithm == "blake3":
+		if blake3 is None:
+			raise RuntimeError("download.hash_algorithm is blake3 but the blake3 package is not installed")
+		return blake3.blake3(max_threads=blake3.blake3.AUTO)
+	return hashlib.sha256()
+
+
+def _preallocate(fd: int, total: int, headers) -> bool:
+	"""
+	Reserve the announced body size up front so large files are laid out in
+	few extents instead of growing chunk by chunk. Only done when the length
+	is the size of the decoded body (no Content-Encoding).
+	"""
+	if total <= 0 or headers.get("content-encoding") or not hasattr(os, "posix_fallocate"):
+		return False
+	try:
+		os.posix_fallocate(fd, 0, total)
+	except OSError:
+		# Unsupported by the filesystem (or out of space, which the writes will report).
+		return False
+	return True
+
+
+def _read_buffer() -> memoryview:
+	"""Return this thread's download buffer, allocating it on first use."""
+	view = getattr(_BUFFERS, "view", None)
+	if view is None:
+		view = _BUFFERS.view = memoryview(bytearray(_CHUNK_SIZE))
+	return view
+
+
+def _write_all(fd: int, data: memoryview) -> None:
+	"""Write the whole buffer to a file descriptor, handling short writes."""
+	while data:
+		written = os.write(fd, data)
+		data = data[written:]
 
 
 def _format_bytes(size: int) -> str:
 	"""Convert a size in bytes into a human-friendly string."""
-	thresholds = [
-		(1024 ** 3, "GB"),
-		(1024 ** 2, "MB"),
-		(1024, "KB"),
-	]
-	for factor, suffix in thresholds:
-		if size >= factor:
-			value = size / factor
-			if value < 10:
-				return f"{value:.2f} {suffix}"
-			return f"{value:.1f} {suffix}"
-	return f"{size} B"
+	if size < 1024:
+		return f"{size} B"
+	# Each unit is 2**10 larger, so the bit length picks the unit directly.
+	idx = min((size.bit_length() - 1) // 10, 3)
+	value = size / (1 << (idx * 10))
+	suffix = _BYTE_UNITS[idx]
+	if value < 10:
+		return f"{value:.2f} {suffix}"
+	return f"{value:.1f} {suffix}"
@@ -1,9 +1,11 @@
-import json
-import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+import os
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Any, Callable, Dict, Iterable
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 import requests
 
@@ -15,11 +17,13 @@ from classify import (
 )
 from config import GlobalConfig, InstanceConfig
 from downloader import download_and_sha256
-from filenames import build_filepath, build_log_path
+from filenames import PathBuilder, build_filepath, build_log_path
 from fileops import move_to_archive
 from filters import should_skip
 from interfaces import HashDB
-from util import parse_time
+from jsonl import AsyncJsonlWriter, JSONDecodeError, dumps_line, loads
+from rate import RateLimiter
+from util import media_url, parse_time
 
 
 def _safe_parse_created(value: str | None) -> datetime | None:
@@ -38,11 +42,20 @@ def _safe_parse_created(value: str | None) -> datetime | None:
 class RemovedMediaTracker:
 	"""
 	Track media URLs that recently returned media_not_found to avoid repeats.
+
+	Recent entries are cached in a sidecar next to the removed log together
+	with the log offset they cover, so startup only parses records appended
+	since the previous run instead of the whole history. In dry-run mode
+	the sidecar is only read, never written.
 	"""
 
-	def __init__(self, removed_path: Path, window_seconds: float | None):
+	_SIDECAR_VERSION = 1
+
+	def __init__(self, removed_path: Path, window_seconds: float | None, dry_run: bool = False):
 		self.removed_path = removed_path
+		self.sidecar_path = removed_path.with_name(removed_path.stem + ".recent.json")
 		self.window_seconds = window_seconds or 0.0
+		self.dry_run = dry_run
 		self.enabled = self.window_seconds > 0
 		self._recent: dict[str, datetime] = {}
 		if self.enabled:
@@ -51,10 +64,9 @@ class RemovedMediaTracker:
 	def _parse_timestamp(self, value: str | None) -> datetime | None:
 		if not value:
 			return None
-		text = value.replace("Z", "+00:00")
 		try:
-			ts = datetime.fromisoformat(text)
-		except ValueError:
+			ts = parse_time(value)
+		except (ValueError, TypeError):
 			return None
 		# Normalize to timezone-aware UTC for consistent comparisons.
 		if ts.tzinfo is None:
@@ -65,23 +77,74 @@ class RemovedMediaTracker:
 		if not self.removed_path.exists():
 			return
 		cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.window_seconds)
-		with open(self.removed_path, "r", encoding="utf-8") as f:
-			for line in f:
-				line = line.strip()
-				if not line:
-					continue
-				try:
-					entry = json.loads(line)
-				except json.JSONDecodeError:
-					continue
-				if entry.get("reason") != "media_not_found":
-					continue
-				ts = self._parse_timestamp(entry.get("time"))
-				if ts is None or ts < cutoff:
-					continue
-				for url in entry.get("media_urls") or []:
-					if url:
-						self._recent[url] = ts
+		with open(self.removed_path, "rb") as f:
+			size = f.seek(0, 2)
+			offset = self._load_sidecar(size, cutoff)
+			f.seek(offset)
+			data = f.read()
+
+		# Leave a partially written last line for the next run.
+		end = data.rfind(b"\n") + 1
+		for line in data[:end].split(b"\n"):
+			if not line:
+				continue
+			try:
+				entry = loads(line)
+			except JSONDecodeError:
+				continue
+			if entry.get("reason") != "media_not_found":
+				continue
+			ts = self._parse_timestamp(entry.get("time"))
+			if ts is None or ts < cutoff:
+				continue
+			for url in entry.get("media_urls") or []:
+				if url:
+					self._recent[url] = ts
+
+		if not self.dry_run:
+			self._save_sidecar(offset + end)
+
+	def _load_sidecar(self, size: int, cutoff: datetime) -> int:
+		"""
+		Restore cached entries newer than cutoff and return the log offset they
+		cover, or 0 when the cache is missing, stale or unusable.
+		"""
+		try:
+			state = loads(self.sidecar_path.read_bytes())
+			offset = state["offset"]
+			usable = (
+				state.get("version") == self._SIDECAR_VERSION
+				and isinstance(offset, int)
+				and 0 <= offset <= size
+				and state["window"] >= self.window_seconds
+			)
+			recent = dict(state["recent"]) if usable else {}
+		except (OSError, ValueError, KeyError, TypeError, AttributeError):
+			return 0
+		if not usable:
+			# The log was truncated/replaced or the window grew: rescan it all.
+			return 0
+		for url, value in recent.items():
+			ts = self._parse_timestamp(value) if isinstance(value, str) else None
+			if ts is not None and ts >= cutoff:
+				self._recent[url] = ts
+		return offset
+
+	def _save_sidecar(self, offset: int) -> None:
+		"""Atomically write the current entries and the offset they cover."""
+		state = {
+			"version": self._SIDECAR_VERSION,
+			"offset": offset,
+			"window": self.window_seconds,
+			"recent": {url: ts.isoformat() for url, ts in self._recent.items()},
+		}
+		tmp_path = self.sidecar_path.with_name(self.sidecar_path.name + ".tmp")
+		try:
+			tmp_path.write_bytes(dumps_line(state))
+			os.replace(tmp_path, self.sidecar_path)
+		except OSError:
+			# The cache is an optimization only; the removed log stays authoritative.
+			tmp_path.unlink(missing_ok=True)
 
 	def should_skip(self, url: str | None) -> bool:
 		if not self.enabled or not url:
@@ -97,6 +160,15 @@ class RemovedMediaTracker:
 				self._recent[url] = now
 
 
+# Shared background appender for per-status download logs.
+_LOG_WRITER = AsyncJsonlWriter()
+
+
+def flush_logs() -> None:
+	"""Write buffered download log records to disk."""
+	_LOG_WRITER.flush()
+
+
 def log_download(
 	status: Dict[str, Any],
 	inst: InstanceConfig,
@@ -108,12 +180,18 @@ def log_download(
 	origin_group: str,
 	account_host: str,
 	account_group: str,
+	builder: PathBuilder | None = None,
+	media_urls: List[str | None] | None = None,
 ) -> None:
-	"""Append download log entry to jsonl"""
-	media_urls = [
-		m.get("remote_url") or m.get("url")
-		for m in (status.get("media_attachments") or [])
-	]
+	"""
+	Append download log entry to jsonl.
+	Callers logging several entries for one status may pass media_urls.
+	"""
+	if config.runtime.dry_run:
+		return
+
+	if media_urls is None:
+		media_urls = list(map(media_url, status.get("media_attachments") or []))
 
 	record = {
 		"time": datetime.now(timezone.utc).isoformat(),
@@ -137,14 +215,17 @@ def log_download(
 		"instance_label": inst.name,
 	}
 
-	if config.runtime.dry_run:
-		return
-
-	log_path = build_log_path(status, inst, config)
-	log_path.parent.mkdir(parents=True, exist_ok=True)
-
-	with open(log_path, "a", encoding="utf-8") as f:
-		f.write(json.dumps(record) + "\n")
+	log_path = build_log_path(
+		status,
+		inst,
+		config,
+		builder=builder,
+		origin_host=origin_host,
+		origin_group=origin_group,
+		account_host=account_host,
+		account_group=account_group,
+	)
+	_LOG_WRITER.append(log_path, record)
 
 
 def _guess_extension(media: Dict[str, Any]) -> str:
@@ -152,7 +233,7 @@ def _guess_extension(media: Dict[str, Any]) -> str:
 	Guess a reasonable file extension for a media attachment.
 	Prefers URL suffixes; falls back to MIME type or 'png'.
 	"""
-	source = media.get("remote_url") or media.get("url") or ""
+	source = media_url(media) or ""
 	if source:
 		path = urlparse(source).path
 		suffix = Path(path).suffix.lower().lstrip(".")
@@ -178,20 +259,24 @@ def log_removed(
 	account_host: str | None,
 	account_group: str | None,
 	config: GlobalConfig,
+	media_urls: List[str | None] | None = None,
 ) -> None:
 	"""
 	Record a discarded media entry in the removal log database.
 	Does nothing during dry-run.
 	"""
+	if config.runtime.dry_run:
+		return
+
+	if media_urls is None:
+		media_urls = list(map(media_url, status.get("media_attachments") or []))
+
 	record = {
 		"time": datetime.now(timezone.utc).isoformat(),
 		"sha256": sha256,
 		"statusid": str(status.get("id")),
 		"status_url": status.get("url"),
-		"media_urls": [
-			m.get("remote_url") or m.get("url")
-			for m in (status.get("media_attachments") or [])
-		],
+		"media_urls": media_urls,
 		"reason": reason,
 		"created_at": status.get("created_at"),
 
@@ -205,8 +290,7 @@ def log_removed(
 		"instance_label": inst.name,
 	}
 
-	if not config.runtime.dry_run:
-		db.log_removed(record)
+	db.log_removed(record)
 
 
 
@@ -221,6 +305,8 @@ def replace_existing(
 	origin_group: str,
 	account_host: str,
 	account_group: str,
+	builder: PathBuilder | None = None,
+	media_urls: List[str | None] | None = None,
 ) -> None:
 	"""
 	Replace older stored image with newer one.
@@ -266,10 +352,90 @@ def replace_existing(
 		origin_group,
 		account_host,
 		account_group,
+		builder=builder,
+		media_urls=media_urls,
 	)
 
 
 
+# (attachment index, media object, download URL, progress label)
+_MediaJob = tuple[int, Dict[str, Any], str, str | None]
+
+# (tmpfile, sha256, size) of a finished download, or the HTTP error it raised
+_MediaResult = tuple[str, str, int] | requests.HTTPError
+
+# (account_host, account_group, jobs) of a status that passed the filters
+_PreparedStatus = tuple[str, str, list[_MediaJob]]
+
+
+def _download_media(
+	jobs: list[_MediaJob],
+	config: GlobalConfig,
+) -> Iterator[tuple[_MediaJob, _MediaResult]]:
+	"""
+	Download the attachments of one status, yielding (job, result) in order.
+
+	HTTP errors are yielded as the result so the caller can decide how to
+	handle them. With download.concurrency above 1 the files are fetched in
+	parallel and progress labels are dropped, since the lines would interleave.
+	Temp files of results that are never consumed are removed on close.
+	"""
+	workers = min(config.download.concurrency, len(jobs))
+	if workers <= 1:
+		for job in jobs:
+			try:
+				result = download_and_sha256(job[2], config, progress_label=job[3])
+			except requests.HTTPError as err:
+				result = err
+			yield job, result
+		return
+
+	with ThreadPoolExecutor(max_workers=workers) as pool:
+		yield from _collect_downloads(jobs, _submit_downloads(pool, jobs, config))
+
+
+def _submit_downloads(
+	pool: ThreadPoolExecutor,
+	jobs: list[_MediaJob],
+	config: GlobalConfig,
+) -> list[Future]:
+	"""Start downloading every job on the pool (without progress labels)."""
+	return [pool.submit(download_and_sha256, job[2], config) for job in jobs]
+
+
+def _collect_downloads(
+	jobs: list[_MediaJob],
+	futures: list[Future],
+) -> Iterator[tuple[_MediaJob, _MediaResult]]:
+	"""
+	Yield (job, result) in order as submitted downloads finish.
+	Temp files of results that are never consumed are removed on close.
+	"""
+	consumed = 0
+	try:
+		for job, future in zip(jobs, futures):
+			consumed += 1
+			try:
+				result = future.result()
+			except requests.HTTPError as err:
+				result = err
+			yield job, result
+	finally:
+		_discard_downloads(futures[consumed:])
+
+
+def _discard_downloads(futures: Iterable[Future]) -> None:
+	"""Cancel pending downloads and remove temp files of finished ones."""
+	for future in futures:
+		if future.cancel():
+			continue
+		try:
+			tmpfile, _, _ = future.result()
+		except Exception:
+			continue
+		Path(tmpfile).unlink(missing_ok=True)
+
+
 def process_status(
 	status: Dict[str, Any],
 	inst: InstanceConfig,
@@ -281,14 +447,64 @@ def process_status(
 	total_label: str,
 	progress_label: str | None = None,
 	removed_tracker: RemovedMediaTracker | None = None,
+	path_builder: PathBuilder | None = None,
 ) -> bool:
 	"""
 	Process a single status
 	"""
 
+	prepared = _prepare_status(
+		status,
+		inst,
+		db,
+		config,
+		progress_mode,
+		status_idx,
+		total_label,
+		progress_label,
+		removed_tracker,
+	)
+	if prepared is None:
+		return False
+
+	account_host, account_group, jobs = prepared
+	with closing(_download_media(jobs, config)) as downloads:
+		return _store_media(
+			status,
+			inst,
+			db,
+			config,
+			progress_mode,
+			status_idx,
+			total_label,
+			downloads,
+			account_host,
+			account_group,
+			removed_tracker,
+			path_builder,
+		)
+
+
+def _prepare_status(
+	status: Dict[str, Any],
+	inst: InstanceConfig,
+	db: HashDB,
+	config: GlobalConfig,
+	progress_mode: str,
+	status_idx: int,
+	total_label: str,
+	progress_label: str | None,
+	removed_tracker: RemovedMediaTracker | None,
+) -> _PreparedStatus | None:
+	"""
+	Apply the skip rules and collect the attachments to download.
+	Returns None (after logging the reason) when the status is skipped.
+	"""
+
 	# skip rule
 	skip, reason = should_skip(status, inst, config)
 	if skip:
+		media_urls = list(map(media_url, status.get("media_attachments") or []))
 		if config.logging.log_removed:
 			log_removed(
 				db,
@@ -301,19 +517,16 @@ def process_status(
 				account_host=None,
 				account_group=None,
 				config=config,
+				media_urls=media_urls,
 			)
 		if progress_mode != "off":
-			media_urls = [
-				m.get("remote_url") or m.get("url")
-				for m in (status.get("media_attachments") or [])
-			]
 			visible_reason = reason or "filtered"
 			if media_urls:
 				url_info = media_urls[0]
 			else:
 				url_info = "no media"
 			print(f"[{inst.name}] {status_idx}/{total_label} skip {visible_reason}: {url_info}")
-		return False
+		return None
 
 	media_list = status.get("media_attachments") or []
 
@@ -321,11 +534,11 @@ def process_status(
 	account_host = classify_account_host(status)
 	account_group = classify_account_group(account_host, config)
 
-	any_downloaded = False
-
+	# collect downloadable attachments first so they can be fetched together
+	jobs: list[_MediaJob] = []
 	for idx, media in enumerate(media_list):
 
-		remote_url = media.get("remote_url") or media.get("url")
+		remote_url = media_url(media)
 		if not remote_url:
 			continue
 
@@ -334,22 +547,49 @@ def process_status(
 				print(f"[{inst.name}] {status_idx}/{total_label} skip media_not_found_cached: {remote_url}")
 			continue
 
+		label = None
+		if progress_mode == "filesize" and progress_label:
+			label = progress_label.format(idx=idx + 1)
+		jobs.append((idx, media, remote_url, label))
+
+	return account_host, account_group, jobs
+
+
+def _store_media(
+	status: Dict[str, Any],
+	inst: InstanceConfig,
+	db: HashDB,
+	config: GlobalConfig,
+	progress_mode: str,
+	status_idx: int,
+	total_label: str,
+	downloads: Iterable[tuple[_MediaJob, _MediaResult]],
+	account_host: str,
+	account_group: str,
+	removed_tracker: RemovedMediaTracker | None,
+	path_builder: PathBuilder | None,
+) -> bool:
+	"""
+	Deduplicate, move and record downloaded attachments of a status.
+	Returns True when at least one attachment was downloaded.
+	"""
+
+	if path_builder is None:
+		path_builder = PathBuilder(config)
+
+	any_downloaded = False
+
+	# shared by every log record of this status
+	media_urls = list(map(media_url, status.get("media_attachments") or []))
+
+	for (idx, media, remote_url, _), outcome in downloads:
+
 		# origin classification
 		origin_host = classify_origin_host(remote_url)
 		origin_group = classify_origin_group(origin_host, config)
 
-		# download
-		label = None
-		if progress_mode == "filesize" and progress_label:
-			label = progress_label.format(idx=idx + 1)
-		try:
-			tmpfile, sha256, size = download_and_sha256(
-				remote_url,
-				config,
-				progress_label=label,
-			)
-			any_downloaded = True
-		except requests.HTTPError as err:
+		if isinstance(outcome, requests.HTTPError):
+			err = outcome
 			status_code = err.response.status_code if err.response is not None else None
 			if status_code == 404:
 				if removed_tracker:
@@ -366,11 +606,15 @@ def process_status(
 						account_host=account_host,
 						account_group=account_group,
 						config=config,
+						media_urls=media_urls,
 					)
 				if progress_mode != "off":
 					print(f"[{inst.name}] {status_idx}/{total_label} skip media_not_found: {remote_url}")
 				continue
-			raise
+			raise err
+
+		tmpfile, sha256, size = outcome
+		any_downloaded = True
 
 		# check duplicate
 		existing = db.get(sha256)
@@ -392,6 +636,7 @@ def process_status(
 						account_host=account_host,
 						account_group=account_group,
 						config=config,
+						media_urls=media_urls,
 					)
 				Path(tmpfile).unlink(missing_ok=True)
 				continue
@@ -412,6 +657,7 @@ def process_status(
 						account_host=account_host,
 						account_group=account_group,
 						config=config,
+						media_urls=media_urls,
 					)
 				Path(tmpfile).unlink(missing_ok=True)
 				continue
@@ -429,6 +675,7 @@ def process_status(
 						account_host=account_host,
 						account_group=account_group,
 						config=config,
+						media_urls=media_urls,
 					)
 				Path(tmpfile).unlink(missing_ok=True)
 				continue
@@ -445,6 +692,8 @@ def process_status(
 					origin_group,
 					account_host,
 					account_group,
+					builder=path_builder,
+					media_urls=media_urls,
 				)
 				continue
 
@@ -460,6 +709,7 @@ def process_status(
 			origin_group=origin_group,
 			account_host=account_host,
 			account_group=account_group,
+			builder=path_builder,
 		)
 
 		if not config.runtime.dry_run:
@@ -501,12 +751,18 @@ def process_status(
 			origin_group,
 			account_host,
 			account_group,
+			builder=path_builder,
+			media_urls=media_urls,
 		)
 
 	return any_downloaded
 
 
 
+# Statuses unbookmarked together by run_instance (one bookmarks page).
+_UNBOOKMARK_BATCH = 40
+
+
 def run_instance(
 	inst: InstanceConfig,
 	api: Any,
@@ -514,7 +770,16 @@ def run_instance(
 	config: GlobalConfig,
 ) -> None:
 	"""
-	Process bookmarks for a single instance
+	Process bookmarks for a single instance.
+
+	The rate-control delay is a minimum spacing (see RateLimiter), so time
+	spent downloading counts toward it. With download.concurrency above 1 the
+	next status starts downloading while the previous one is stored, and the
+	delay is measured between download starts.
+
+	Unbookmarks are sent in batches (see _UNBOOKMARK_BATCH) and once more
+	when the run ends; failures are reported and left bookmarked. The api
+	client is closed afterwards.
 	"""
 
 	count = 0
@@ -524,57 +789,148 @@ def run_instance(
 	removed_tracker = RemovedMediaTracker(
 		config.paths.removed_log_file,
 		config.removed.skip_media_not_found_for,
+		dry_run=config.runtime.dry_run,
 	)
+	path_builder = PathBuilder(config)
 
-	for status in api.fetch_bookmarks():
-		status_idx = count + 1
-		progress_label = None
-		if progress_mode == "filesize":
-			media_total = len(status.get("media_attachments") or [])
-			base_label = f"[{inst.name}] {status_idx}/{total_label} media"
-			if media_total > 1:
-				progress_label = f"{base_label} {{idx}}/{media_total}"
-			else:
-				progress_label = base_label
-		if progress_mode != "off":
-			status_desc = status.get("url") or f"id={status.get('id')}"
-			print(f"[{inst.name}] {status_idx}/{total_label} status {status_desc}")
-
-		ok = process_status(
-			status,
-			inst,
-			api,
-			db,
-			config,
-			progress_mode,
-			status_idx,
-			total_label,
-			progress_label=progress_label,
-			removed_tracker=removed_tracker,
-		)
-
+	delay = inst.delay_seconds_override
+	if delay is None:
 		delay = config.download.rate.delay_seconds
-		if inst.rate_override is not None:
-			delay = 60.0 / max(inst.rate_override, 0.01)
 
-		if ok:
-			# rate control
-			time.sleep(delay)
+	# resolve final value
+	unbookmark = inst.unbookmark_override
+	if unbookmark is None:
+		unbookmark = config.runtime.unbookmark
 
+	def finish(status: Dict[str, Any], ok: bool) -> bool:
+		"""Count a processed status; returns True once the limit is reached."""
+		nonlocal count
 		count += 1
 		if progress_mode == "count":
-			print(f"[{inst.name}] {status_idx}/{total_label}")
+			print(f"[{inst.name}] {count}/{total_label}")
 		if config.runtime.limit and count >= config.runtime.limit:
-			break
-
-		# resolve final value
-		unbookmark = inst.unbookmark_override
-		if unbookmark is None:
-			unbookmark = config.runtime.unbookmark
+			return True
 
 		# optional unbookmark
 		if ok and unbookmark and not config.runtime.dry_run:
-			api.delete_bookmark(status["id"])
+			unbookmark_ids.append(status["id"])
+			if len(unbookmark_ids) >= _UNBOOKMARK_BATCH:
+				send_unbookmarks()
+		return False
+
+	unbookmark_ids: list[str] = []
+
+	def send_unbookmarks() -> None:
+		failures = api.delete_bookmarks(unbookmark_ids)
+		unbookmark_ids.clear()
+		for status_id, err in failures.items():
+			print(f"[{inst.name}] unbookmark failed for {status_id}: {err}")
+
+	pool = None
+	if config.download.concurrency > 1:
+		pool = ThreadPoolExecutor(max_workers=config.download.concurrency)
+	# (status, status_idx, prepared or None, futures), oldest first
+	in_flight: deque[tuple[Dict[str, Any], int, _PreparedStatus | None, list[Future]]] = deque()
+	limiter = RateLimiter(delay)
+	stopped = False
+
+	def store_oldest() -> bool:
+		status, status_idx, prepared, futures = in_flight.popleft()
+		ok = False
+		if prepared is not None:
+			account_host, account_group, jobs = prepared
+			with closing(_collect_downloads(jobs, futures)) as downloads:
+				ok = _store_media(
+					status,
+					inst,
+					db,
+					config,
+					progress_mode,
+					status_idx,
+					total_label,
+					downloads,
+					account_host,
+					account_group,
+					removed_tracker,
+					path_builder,
+				)
+		return finish(status, ok)
+
+	try:
+		for status_idx, status in enumerate(api.fetch_bookmarks(), start=1):
+			progress_label = None
+			if progress_mode == "filesize":
+				media_total = len(status.get("media_attachments") or [])
+				base_label = f"[{inst.name}] {status_idx}/{total_label} media"
+				if media_total > 1:
+					progress_label = f"{base_label} {{idx}}/{media_total}"
+				else:
+					progress_label = base_label
+			if progress_mode != "off":
+				status_desc = status.get("url") or f"id={status.get('id')}"
+				print(f"[{inst.name}] {status_idx}/{total_label} status {status_desc}")
+
+			if pool is None:
+				ok = process_status(
+					status,
+					inst,
+					api,
+					db,
+					config,
+					progress_mode,
+					status_idx,
+					total_label,
+					progress_label=progress_label,
+					removed_tracker=removed_tracker,
+					path_builder=path_builder,
+				)
+
+				if ok:
+					# rate control
+					limiter.wait()
+
+				if finish(status, ok):
+					break
+				continue
+
+			prepared = _prepare_status(
+				status,
+				inst,
+				db,
+				config,
+				progress_mode,
+				status_idx,
+				total_label,
+				progress_label,
+				removed_tracker,
+			)
+			futures: list[Future] = []
+			if prepared is not None and prepared[2]:
+				# rate control: space download starts by the delay
+				limiter.wait()
+				futures = _submit_downloads(pool, prepared[2], config)
+			in_flight.append((status, status_idx, prepared, futures))
+
+			# keep one status downloading ahead of the one being stored
+			if len(in_flight) > 1 and store_oldest():
+				stopped = True
+				break
+			if config.runtime.limit and status_idx >= config.runtime.limit:
+				break
+
+		while in_flight and not stopped:
+			stopped = store_oldest()
+	finally:
+		for _, _, _, futures in in_flight:
+			_discard_downloads(futures)
+		if pool is not None:
+			pool.shutdown()
+		try:
+			if unbookmark_ids:
+				send_unbookmarks()
+		finally:
+			# The client is done with this instance; drop its pooled connections.
+			api.close()
 
 
 
@@ -590,4 +946,9 @@ def run_all(
 
 	for inst in instances:
 		api = api_factory(inst)
-		run_instance(inst, api, db, config)
+		try:
+			run_instance(inst, api, db, config)
+		finally:
+			# Persist buffered records before the next instance reads them back.
+			db.flush()
+			flush_logs()
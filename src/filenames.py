@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+import re
+from typing import Any, Callable, Dict
 
 from classify import (
 	classify_origin_host,
@@ -9,26 +11,39 @@ from classify import (
 	classify_account_group,
 )
 from config import GlobalConfig, InstanceConfig
-from util import parse_time
+from util import media_url, parse_time
 
 
 def _date_vars(created: datetime) -> Dict[str, Any]:
 	"""Return common date/time components for template expansions."""
+	return {
+		**_day_vars(created.year, created.month, created.day),
+		"datetime": created.strftime("%Y%m%d%H%M%S"),
+	}
+
+
+@lru_cache(maxsize=4096)
+def _day_vars(year: int, month: int, day: int) -> Dict[str, Any]:
+	"""
+	Date components that only depend on the calendar day, memoized since
+	many statuses share a day. Callers must not mutate the returned dict.
+	"""
+	created = date(year, month, day)
 	week = created.isocalendar().week
 	quarter = ((created.month - 1) // 3) + 1
 	half = 1 if created.month <= 6 else 2
+	year_text = created.strftime("%Y")
 	return {
-		"year": created.strftime("%Y"),
+		"year": year_text,
 		"yearmonth": created.strftime("%Y%m"),
 		"date": created.strftime("%Y-%m-%d"),
 		"month": created.strftime("%m"),
 		"week": f"{week:02d}",
 		"quarter": quarter,
 		"half": half,
-		"yearweek": f"{created.strftime('%Y')}W{week:02d}",
-		"yearquarter": f"{created.strftime('%Y')}Q{quarter}",
-		"yearhalf": f"{created.strftime('%Y')}H{half}",
-		"datetime": created.strftime("%Y%m%d%H%M%S"),
+		"yearweek": f"{year_text}W{week:02d}",
+		"yearquarter": f"{year_text}Q{quarter}",
+		"yearhalf": f"{year_text}H{half}",
 	}
 
 
@@ -51,6 +66,38 @@ def _default_log_pattern(freq: str) -> str:
 	return "{origin_group}/{yearmonth}.jsonl"
 
 
+# {key} or {key:N}; N is a prefix length for string values.
+_TEMPLATE_RE = re.compile(r"\{(\w+)(?::(\d+))?\}")
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=64)
+def _parse_template(template: str) -> tuple[tuple[str, str | None, int | None, str], ...]:
+	"""
+	Split a template into (literal, key, width, tag) parts.
+	Widths outside 1..64 (or with leading zeros) are not placeholders.
+	"""
+	parts = []
+	literal = []
+	pos = 0
+	for m in _TEMPLATE_RE.finditer(template):
+		literal.append(template[pos:m.start()])
+		pos = m.end()
+		key, digits = m.group(1), m.group(2)
+		width = None
+		if digits is not None:
+			width = int(digits)
+			if not 1 <= width <= 64 or str(width) != digits:
+				literal.append(m.group(0))
+				continue
+		parts.append(("".join(literal), key, width, m.group(0)))
+		literal = []
+	literal.append(template[pos:])
+	parts.append(("".join(literal), None, None, ""))
+	return tuple(parts)
+
+
 def format_template(template: str, vars: Dict[str, Any]) -> str:
 	"""
 	Very small template engine:
@@ -58,22 +105,68 @@ def format_template(template: str, vars: Dict[str, Any]) -> str:
 	- Supports partial: {sha256:8} → prefix first 8 chars
 	- Leaves unknown keys untouched
 	"""
+	return _compile_template(template)(vars)
 
-	out = template
 
-	for key, val in vars.items():
-		# Basic replacement
-		out = out.replace(f"{{{key}}}", str(val))
+@lru_cache(maxsize=64)
+def _compile_template(template: str) -> Callable[[Dict[str, Any]], str]:
+	"""
+	Generate a render function for a template (see _parse_template), so
+	rendering is a few dict lookups and one join with nothing left to interpret.
+	"""
+	lines = ["def render(v):"]
+	pieces = []
+	for i, (literal, key, width, tag) in enumerate(_parse_template(template)):
+		if literal:
+			pieces.append(repr(literal))
+		if key is None:
+			continue
+		lines.append(f"\t_{i} = v.get({key!r}, _MISSING)")
+		if width is None:
+			pieces.append(f"{tag!r} if _{i} is _MISSING else str(_{i})")
+		else:
+			pieces.append(f"_{i}[:{width}] if isinstance(_{i}, str) else {tag!r}")
+	lines.append(f"\treturn ''.join(({''.join(f'({p}), ' for p in pieces)}))")
 
-		# Partial prefix support (e.g., {sha256:8})
-		if isinstance(val, str):
-			# find all occurrences of {key:N}
-			for n in range(1, 65):
-				tag = f"{{{key}:{n}}}"
-				if tag in out:
-					out = out.replace(tag, val[:n])
+	namespace: Dict[str, Any] = {"_MISSING": _MISSING}
+	exec("\n".join(lines), namespace)
+	return namespace["render"]
 
-	return out
+
+DEFAULT_FILENAME_PATTERN = "{origin_group}/{yearmonth}/{screenname}-{datetime}-{index}.{ext}"
+
+
+class PathBuilder:
+	"""
+	Output and log path renderer for one configuration.
+	Templates are compiled and base directories resolved once, so
+	run_instance builds one and reuses it for every status.
+	"""
+
+	__slots__ = ("filename_template", "log_template", "download_root", "log_root")
+
+	def __init__(self, config: GlobalConfig):
+		pattern = getattr(config.download, "filename_pattern", None) or DEFAULT_FILENAME_PATTERN
+		self.filename_template = _compile_template(pattern)
+
+		log_cfg = getattr(config, "logging", None)
+		log_pattern = None
+		frequency = "month"
+		if log_cfg:
+			log_pattern = getattr(log_cfg, "filename_pattern", None)
+			frequency = getattr(log_cfg, "frequency", frequency)
+		self.log_template = _compile_template(log_pattern or _default_log_pattern(frequency))
+
+		self.download_root = Path(config.paths.download)
+		self.log_root = Path(getattr(config.paths, "logs", Path("logs")))
+
+	def render_file(self, vars: Dict[str, Any]) -> Path:
+		"""Return the download path for the given template variables."""
+		return self.download_root / self.filename_template(vars)
+
+	def render_log(self, vars: Dict[str, Any]) -> Path:
+		"""Return the log file path for the given template variables."""
+		return self.log_root / self.log_template(vars)
 
 
 
@@ -88,6 +181,7 @@ def build_filepath(
 	origin_group: str,
 	account_host: str,
 	account_group: str,
+	builder: PathBuilder | None = None,
 ) -> Path:
 	"""
 	Build output file path based on template.
@@ -120,13 +214,9 @@ def build_filepath(
 
 	vars.update(_date_vars(created))
 
-	# pattern from config or default
-	tmpl = getattr(config.download, "filename_pattern", None) or \
-		"{origin_group}/{yearmonth}/{screenname}-{datetime}-{index}.{ext}"
-
-	rel = format_template(tmpl, vars)
-
-	return Path(config.paths.download) / rel
+	if builder is None:
+		builder = PathBuilder(config)
+	return builder.render_file(vars)
 
 
 
@@ -134,23 +224,32 @@ def build_log_path(
 	status: Dict[str, Any],
 	inst: InstanceConfig | None,
 	config: GlobalConfig,
+	builder: PathBuilder | None = None,
+	origin_host: str | None = None,
+	origin_group: str | None = None,
+	account_host: str | None = None,
+	account_group: str | None = None,
 ) -> Path:
 	"""
 	Build log path based on logging configuration.
+	Callers that already classified the status pass the results; missing
+	ones are derived from the first attachment and the account URL.
 	"""
 
-	media = (status.get("media_attachments") or [{}])[0]
-	url = media.get("remote_url") or media.get("url")
+	if origin_host is None or origin_group is None:
+		media = (status.get("media_attachments") or [{}])[0]
+		url = media_url(media)
 
-	if url:
-		origin_host = classify_origin_host(url)
-		origin_group = classify_origin_group(origin_host, config)
-	else:
-		origin_host = "unknown"
-		origin_group = "unknown"
+		if url:
+			origin_host = classify_origin_host(url)
+			origin_group = classify_origin_group(origin_host, config)
+		else:
+			origin_host = "unknown"
+			origin_group = "unknown"
 
-	account_host = classify_account_host(status)
-	account_group = classify_account_group(account_host, config)
+	if account_host is None or account_group is None:
+		account_host = classify_account_host(status)
+		account_group = classify_account_group(account_host, config)
 
 	created = parse_time(status["created_at"])
 
@@ -164,20 +263,9 @@ def build_log_path(
 
 	vars.update(_date_vars(created))
 
-	log_cfg = getattr(config, "logging", None)
-	pattern = None
-	frequency = "month"
-
-	if log_cfg:
-		pattern = getattr(log_cfg, "filename_pattern", None)
-		frequency = getattr(log_cfg, "frequency", frequency)
-
-	base_dir = getattr(config.paths, "logs", Path("logs"))
-
-	tmpl = pattern or _default_log_pattern(frequency)
-	rel = format_template(tmpl, vars)
-
-	return Path(base_dir) / rel
+	if builder is None:
+		builder = PathBuilder(config)
+	return builder.render_log(vars)
 
 
 def build_tmp_path(sha256: str, config: GlobalConfig) -> Path:
@@ -2,6 +2,7 @@ from typing import Dict, Any
 from urllib.parse import urlparse
 
 from config import GlobalConfig, InstanceConfig
+from util import media_url
 
 
 IMAGE_EXTENSIONS = {
@@ -15,14 +16,34 @@ IMAGE_EXTENSIONS = {
 	".avif",
 }
 
+# str.endswith takes a tuple and checks it in C; only the tail needs lowercasing.
+_IMAGE_SUFFIXES = tuple(IMAGE_EXTENSIONS)
+_IMAGE_SUFFIX_MAX_LEN = max(map(len, _IMAGE_SUFFIXES))
+
+
+# Media type flags for should_skip. Images (and attachments without a type)
+# set none; gifv also counts as a non-image type for include_video.
+_HAS_GIFV = 1
+_HAS_AUDIO = 2
+_HAS_OTHER = 4
+
+_TYPE_FLAGS: Dict[Any, int] = {
+	None: 0,
+	"image": 0,
+	"gifv": _HAS_GIFV | _HAS_OTHER,
+	"audio": _HAS_AUDIO,
+}
+
+_UNKNOWN_TYPES = (None, "unknown", "other", "")
+
 
 def _looks_like_image(media: Dict[str, Any]) -> bool:
 	"""Heuristic check to treat unknown media as images based on URL extension."""
-	url = media.get("remote_url") or media.get("url") or ""
+	url = media_url(media) or ""
 	if not url:
 		return False
-	path = urlparse(url).path.lower()
-	return any(path.endswith(ext) for ext in IMAGE_EXTENSIONS)
+	tail = urlparse(url).path[-_IMAGE_SUFFIX_MAX_LEN:].lower()
+	return tail.endswith(_IMAGE_SUFFIXES)
 
 
 def should_skip(status: Dict[str, Any], inst: InstanceConfig, config: GlobalConfig) -> tuple[bool, str | None]:
@@ -30,8 +51,16 @@ def should_skip(status: Dict[str, Any], inst: InstanceConfig, config: GlobalConf
 	Return (True, reason) when a status should be skipped.
 	"""
 
+	# Cheap status-level checks first.
+	media = status.get("media_attachments") or []
+	if not media:
+		return True, "no_media"
+
 	filter_cfg = config.download.filter
 
+	if not filter_cfg.include_nsfw and status.get("sensitive"):
+		return True, "nsfw_filtered"
+
 	# Skip posts authored by the configured account when include_self is false.
 	if not filter_cfg.include_self:
 		account = status.get("account") or {}
@@ -40,51 +69,38 @@ def should_skip(status: Dict[str, Any], inst: InstanceConfig, config: GlobalConf
 		if inst.account_id and account_id is not None and str(account_id) == str(inst.account_id):
 			return True, "self_post"
 
-		handle = inst.account_handle
-		if handle:
-			target = handle.lstrip("@").lower()
-			candidates = set()
+		target = inst.handle_target
+		if target:
 			acct = account.get("acct")
 			username = account.get("username")
-			if acct:
-				candidates.add(acct.lstrip("@").lower())
-			if username:
-				candidates.add(username.lstrip("@").lower())
-			if target in candidates:
+			if (acct and acct.lstrip("@").lower() == target) or (username and username.lstrip("@").lower() == target):
 				return True, "self_post"
 
-	media = status.get("media_attachments") or []
-	if not media:
-		return True, "no_media"
-
-	types = set()
+	# One pass over the attachments, collecting type flags.
+	try_unknown = filter_cfg.try_unknown_media
+	flags = 0
+	all_remote = True
 	for m in media:
 		mtype = m.get("type")
 		if isinstance(mtype, str):
 			mtype = mtype.lower()
-		if filter_cfg.try_unknown_media and (mtype is None or mtype in {"unknown", "other", ""}):
+		if try_unknown and mtype in _UNKNOWN_TYPES and _looks_like_image(m):
 			# When enabled, treat unknown media that look like image URLs as images.
-			if _looks_like_image(m):
-				mtype = "image"
-		types.add(mtype)
+			mtype = "image"
+		flags |= _TYPE_FLAGS.get(mtype, _HAS_OTHER)
+		if all_remote and not m.get("remote_url"):
+			all_remote = False
 
-	if not filter_cfg.include_gifv and "gifv" in types:
+	if not filter_cfg.include_gifv and flags & _HAS_GIFV:
 		return True, "gifv_media"
 
-	non_image_types = {t for t in types if t not in {None, "image"}}
-
-	if "audio" in non_image_types:
-		if not filter_cfg.include_audio:
-			return True, "audio_media"
-		non_image_types.remove("audio")
+	if not filter_cfg.include_audio and flags & _HAS_AUDIO:
+		return True, "audio_media"
 
-	if non_image_types and not filter_cfg.include_video:
+	if not filter_cfg.include_video and flags & _HAS_OTHER:
 		return True, "non_image_media"
 
-	if not filter_cfg.include_thumbnail_only and not all(m.get("remote_url") for m in media):
+	if not filter_cfg.include_thumbnail_only and not all_remote:
 		return True, "no_remote_url"
 
-	if not filter_cfg.include_nsfw and status.get("sensitive"):
-		return True, "nsfw_filtered"
-
 	return False, None
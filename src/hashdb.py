@@ -1,7 +1,35 @@
-import json
+import os
 from pathlib import Path
 from typing import Optional, Dict, Any, Iterable, List
 
+from config import GlobalConfig
+from interfaces import HashDB
+from jsonl import AsyncJsonlWriter, dumps_line, loads
+
+
+def normalize_path(value: str | Path) -> str:
+	"""Normalize a path to an absolute string for comparison/deduping."""
+	return str(Path(value).expanduser().resolve(strict=False))
+
+
+def normalize_stored_path(value: str, resolved_dirs: Dict[str, str]) -> str:
+	"""
+	Normalize like normalize_path, resolving each parent directory once.
+	Stored files share a handful of directories, so this avoids touching
+	the filesystem for every entry. A path that is itself a symlink is
+	still resolved in full.
+	"""
+	head, tail = os.path.split(os.path.expanduser(value))
+	if tail in ("", ".", ".."):
+		return normalize_path(value)
+	parent = resolved_dirs.get(head)
+	if parent is None:
+		parent = resolved_dirs[head] = normalize_path(head or ".")
+	joined = os.path.join(parent, tail)
+	if os.path.islink(joined):
+		return normalize_path(value)
+	return joined
+
 
 class JsonlHashDB:
 	def __init__(self, path: Path, removed_path: Path):
@@ -9,24 +37,26 @@ class JsonlHashDB:
 		self.path = path
 		self.removed_path = removed_path
 		self.entries: Dict[str, Dict[str, Any]] = {}  # sha256 -> entry
+		# Appends are written by a background thread, off the download loop.
+		self._writer = AsyncJsonlWriter()
 
 		if self.path.exists():
 			self._load()
 
 	def _load(self):
 		"""Populate the in-memory cache from the on-disk database."""
-		with open(self.path, "r", encoding="utf-8") as f:
-			for line in f:
-				line = line.strip()
-				if not line:
-					continue
-				try:
-					obj = json.loads(line)
-					sha = obj["sha256"]
-					self.entries[sha] = obj
-				except Exception:
-					# Ignore malformed lines so a corrupt record does not break load.
-					continue
+		# One bulk read and no per-line strip: JSON parsers accept surrounding
+		# whitespace, and whitespace-only lines fail to parse and are skipped.
+		entries = self.entries
+		for line in self.path.read_bytes().split(b"\n"):
+			if not line:
+				continue
+			try:
+				obj = loads(line)
+				entries[obj["sha256"]] = obj
+			except Exception:
+				# Ignore malformed lines so a corrupt record does not break load.
+				continue
 
 	def get(self, sha: str) -> Optional[Dict[str, Any]]:
 		"""Return the stored entry for the given sha256 hash, if any."""
@@ -36,27 +66,34 @@ class JsonlHashDB:
 		"""Append a new entry to the database and update the cache."""
 		sha = entry["sha256"]
 		self.entries[sha] = entry
-		self.path.parent.mkdir(parents=True, exist_ok=True)
-		with open(self.path, "a", encoding="utf-8") as f:
-			f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+		self._writer.append(self.path, entry)
 
 	def log_removed(self, entry: Dict[str, Any]):
 		"""Append a record to the removed-log JSONL file."""
 		# Entry is expected to include sha256, status metadata, timestamps, etc.
-		self.removed_path.parent.mkdir(parents=True, exist_ok=True)
-		with open(self.removed_path, "a", encoding="utf-8") as f:
-			f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+		self._writer.append(self.removed_path, entry)
+
+	def flush(self):
+		"""Write buffered appends to disk."""
+		self._writer.flush()
+
+	def close(self):
+		"""Flush buffered appends and close the underlying files."""
+		self._writer.close()
 
 	def _normalize_path(self, value: str | Path) -> str:
 		"""Normalize a path to an absolute string for comparison/deduping."""
-		return str(Path(value).expanduser().resolve(strict=False))
+		return normalize_path(value)
 
 	def _rewrite_entries(self):
-		"""Rewrite the database file with the current in-memory entries."""
+		"""Atomically rewrite the database file with the current in-memory entries."""
+		# Drop the append handle so buffered records cannot land after the rewrite.
+		self._writer.close(self.path)
 		self.path.parent.mkdir(parents=True, exist_ok=True)
-		with open(self.path, "w", encoding="utf-8") as f:
-			for entry in self.entries.values():
-				f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+		tmp_path = self.path.with_name(self.path.name + ".tmp")
+		with open(tmp_path, "wb") as f:
+			f.writelines(map(dumps_line, self.entries.values()))
+		os.replace(tmp_path, self.path)
 
 	def delete_by_filepaths(self, paths: Iterable[str | Path]) -> List[Dict[str, Any]]:
 		"""Remove entries matching the provided file paths and rewrite disk."""
@@ -64,16 +101,27 @@ class JsonlHashDB:
 		if not targets:
 			return []
 
+		resolved_dirs: Dict[str, str] = {}
 		removed: List[Dict[str, Any]] = []
-		for sha, entry in list(self.entries.items()):
+		kept: Dict[str, Dict[str, Any]] = {}
+		for sha, entry in self.entries.items():
 			fp = entry.get("filepath")
-			if not fp:
-				continue
-			if self._normalize_path(fp) in targets:
+			if fp and normalize_stored_path(fp, resolved_dirs) in targets:
 				removed.append(entry)
-				del self.entries[sha]
+			else:
+				kept[sha] = entry
 
 		if removed:
+			self.entries = kept
 			self._rewrite_entries()
 
 		return removed
+
+
+def open_hashdb(config: GlobalConfig) -> HashDB:
+	"""Open the hash database using the backend selected by hashdb.backend."""
+	if config.hashdb.backend == "sqlite":
+		from sqlite_hashdb import SqliteHashDB
+
+		return SqliteHashDB(config.paths.hashdb_file, config.paths.removed_log_file)
+	return JsonlHashDB(config.paths.hashdb_file, config.paths.removed_log_file)
@@ -16,6 +16,14 @@ class BookmarksAPI(Protocol):
 		"""Remove a bookmark by status ID."""
 		...
 
+	def delete_bookmarks(self, status_ids: Iterable[str]) -> Dict[str, Exception]:
+		"""Remove several bookmarks; returns the errors of failed IDs."""
+		...
+
+	def close(self) -> None:
+		"""Release network resources held by the client."""
+		...
+
 
 class HashDB(Protocol):
 	def get(self, sha: str) -> Optional[Dict[str, Any]]:
@@ -30,6 +38,10 @@ class HashDB(Protocol):
 		"""Record a removed-media entry."""
 		...
 
+	def flush(self) -> None:
+		"""Write any buffered records to storage."""
+		...
+
 	def delete_by_filepaths(self, paths: Iterable[str | Path]) -> Iterable[Dict[str, Any]]:
 		"""Delete entries whose filepaths match any of the provided ones."""
 		...
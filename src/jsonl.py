@@ -0,0 +1,201 @@
+"""
+JSON Lines helpers shared by the hash DB and the log writers.
+
+orjson is used when it is installed (it is an optional dependency);
+otherwise the standard library json module is configured to emit the same
+compact UTF-8 bytes. The fallback rejects NaN/Infinity (orjson writes null).
+"""
+
+import atexit
+import json
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, BinaryIO
+import weakref
+
+try:
+	import orjson
+except ImportError:  # optional dependency
+	orjson = None
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one type covers both.
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any) -> bytes:
+	"""Serialize an object as UTF-8 encoded JSON."""
+	if orjson is not None:
+		return orjson.dumps(obj)
+	return _stdlib_dumps(obj).encode("utf-8")
+
+
+def dumps_line(obj: Any) -> bytes:
+	"""Serialize an object as one UTF-8 encoded JSONL line (with newline)."""
+	if orjson is not None:
+		return orjson.dumps(obj) + b"\n"
+	return (_stdlib_dumps(obj) + "\n").encode("utf-8")
+
+
+def _stdlib_dumps(obj: Any) -> str:
+	"""Serialize with the json module using orjson's compact, non-ASCII form."""
+	return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def loads(data: bytes | str) -> Any:
+	"""Parse a single JSON document from bytes or text."""
+	if orjson is not None:
+		return orjson.loads(data)
+	return json.loads(data)
+
+
+class _Command:
+	"""Control message for the AsyncJsonlWriter thread."""
+
+	__slots__ = ("action", "path", "done")
+
+	def __init__(self, action: str, path: Path | None = None):
+		self.action = action  # "flush", "close" or "stop"
+		self.path = path
+		self.done = threading.Event()
+
+
+class AsyncJsonlWriter:
+	"""
+	JSONL appender that writes from a background thread.
+
+	append() serializes the record and queues it; a daemon thread writes up
+	to ``batch_size`` queued records (or what arrived within
+	``flush_interval`` seconds) and flushes them in one go. flush() and
+	close() wait until everything queued before them is on disk, close()
+	also fsyncs. append() may be called from several threads.
+	"""
+
+	def __init__(self, batch_size: int = 128, flush_interval: float = 0.1, buffer_size: int = 1 << 16):
+		self.batch_size = max(batch_size, 1)
+		self.flush_interval = flush_interval
+		self.buffer_size = buffer_size
+		self._queue: "queue.SimpleQueue[tuple[Path, bytes] | _Command]" = queue.SimpleQueue()
+		self._errors: list[Exception] = []
+		self._thread: threading.Thread | None = None
+		self._lock = threading.Lock()
+		# The thread does not reference the writer, so an unused writer can be
+		# collected; its thread is then told to close its files and exit.
+		weakref.finalize(self, self._queue.put, _Command("stop")).atexit = False
+		_WRITERS.add(self)
+
+	def append(self, path: Path, obj: Any) -> None:
+		"""Queue one record for the given file."""
+		if self._thread is None:
+			self._start()
+		self._queue.put((path, dumps_line(obj)))
+
+	def flush(self) -> None:
+		"""Wait until every queued record is written to disk."""
+		self._send(_Command("flush"))
+
+	def close(self, path: Path | None = None) -> None:
+		"""
+		Write queued records and close one file, or stop the writer thread
+		after closing all of them when path is None. Appending afterwards
+		reopens the file (and restarts the thread).
+		"""
+		if path is None:
+			with self._lock:
+				thread, self._thread = self._thread, None
+			if thread is not None:
+				self._send(_Command("stop"), thread)
+				thread.join()
+		else:
+			self._send(_Command("close", path))
+
+	def _start(self) -> None:
+		with self._lock:
+			if self._thread is None:
+				self._thread = threading.Thread(
+					target=_write_queued,
+					args=(self._queue, self.batch_size, self.flush_interval, self.buffer_size, self._errors),
+					name="jsonl-writer",
+					daemon=True,
+				)
+				self._thread.start()
+
+	def _send(self, command: _Command, thread: threading.Thread | None = None) -> None:
+		"""Queue a command, wait for the thread to run it and re-raise write errors."""
+		if (thread or self._thread) is not None:
+			self._queue.put(command)
+			command.done.wait()
+		if self._errors:
+			error = self._errors[0]
+			self._errors.clear()
+			raise error
+
+
+def _write_queued(
+	q: "queue.SimpleQueue[tuple[Path, bytes] | _Command]",
+	batch_size: int,
+	flush_interval: float,
+	buffer_size: int,
+	errors: list[Exception],
+) -> None:
+	"""AsyncJsonlWriter thread: write queued records in batches until stopped."""
+	files: dict[Path, BinaryIO] = {}
+
+	def finish(paths: list[Path], close: bool) -> None:
+		for path in paths:
+			f = files.pop(path, None) if close else files.get(path)
+			if f is None:
+				continue
+			try:
+				f.flush()
+				if close:
+					os.fsync(f.fileno())
+					f.close()
+			except Exception as e:
+				errors.append(e)
+
+	while True:
+		batch = [q.get()]
+		deadline = time.monotonic() + flush_interval
+		while len(batch) < batch_size and not isinstance(batch[-1], _Command):
+			remaining = deadline - time.monotonic()
+			try:
+				batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+			except queue.Empty:
+				break
+
+		for item in batch:
+			if isinstance(item, _Command):
+				try:
+					targets = list(files) if item.path is None else [item.path]
+					finish(targets, close=item.action != "flush")
+				finally:
+					item.done.set()
+				if item.action == "stop":
+					return
+				continue
+
+			path, line = item
+			try:
+				f = files.get(path)
+				if f is None:
+					path.parent.mkdir(parents=True, exist_ok=True)
+					f = files[path] = open(path, "ab", buffering=buffer_size)
+				f.write(line)
+			except Exception as e:
+				errors.append(e)
+
+		finish(list(files), close=False)
+
+
+# Live writers, closed at interpreter exit so buffered records are not lost.
+_WRITERS: "weakref.WeakSet[AsyncJsonlWriter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_writers() -> None:
+	for writer in list(_WRITERS):
+		writer.close()
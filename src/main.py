@@ -4,7 +4,7 @@ import traceback
 import argparse
 
 from config import load_config, GlobalConfig, InstanceConfig
-from hashdb import JsonlHashDB
+from hashdb import open_hashdb
 from fetch import run_all
 from api import APIFactory
 
@@ -123,10 +123,7 @@ def main():
 
 	# initialize DB (skip if dry-run)
 	try:
-		db = JsonlHashDB(
-			path=config.paths.hashdb_file,
-			removed_path=config.paths.removed_log_file,
-		)
+		db = open_hashdb(config)
 		print(f"[OK] Initialized hashdb: {config.paths.hashdb_file}")
 	except Exception as e:
 		print(f"[ERROR] Failed to init db: {e}")
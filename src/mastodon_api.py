@@ -1,14 +1,33 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple, Optional, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import sys
+from typing import Dict, Any, Iterable, List, Tuple, Optional, Iterator
 
-from urllib.parse import urlparse, parse_qs
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config import InstanceConfig
+from jsonl import dumps_line, loads
 
 USER_AGENT = "gataku/1.0 (+https://github.com/mntone/gataku)"
 
+# Transient API failures are retried with backoff, honoring Retry-After.
+# POST is included because unbookmarking is idempotent.
+_API_RETRY = Retry(
+	total=3,
+	backoff_factor=0.5,
+	status_forcelist=(429, 502, 503, 504),
+	allowed_methods=frozenset({"GET", "POST"}),
+	respect_retry_after_header=True,
+	raise_on_status=False,
+)
+
+# Concurrent unbookmark requests in delete_bookmarks; the connection pool
+# holds one more for the bookmarks page prefetch.
+_DELETE_WORKERS = 4
+
 
 class MastodonAPI:
 	"""
@@ -25,31 +44,85 @@ class MastodonAPI:
 		"""
 		self.inst = inst
 		self.dump_raw = dump_raw
+		self._headers = {
+			"Authorization": f"Bearer {inst.access_token}",
+			"User-Agent": USER_AGENT,
+		}
+
+		# One keep-alive session for every call to this instance, so page
+		# fetches and unbookmarks do not each pay for a TCP/TLS handshake.
+		self._session = requests.Session()
+		self._session.headers.update(self._headers)
+		self._session.mount(
+			f"{inst.base_url.rstrip('/')}/",
+			HTTPAdapter(pool_connections=1, pool_maxsize=_DELETE_WORKERS + 1, max_retries=_API_RETRY),
+		)
+
+	def close(self) -> None:
+		"""Close the keep-alive session and its pooled connections."""
+		self._session.close()
+
+	def __enter__(self) -> "MastodonAPI":
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
 
 	def fetch_bookmarks(self) -> Iterator[Dict[str, Any]]:
 		"""
 		Iterate over all bookmarks for the configured account.
-		Handles pagination transparently via the Link header.
-		"""
-		max_id: Optional[str] = None
-
-		while True:
-			data, max_id = self._fetch_bookmarks_page(max_id=max_id)
-			if not data:
-				break
+		Handles pagination transparently via the Link header. With dump_raw,
+		each page is printed from the calling thread as it is consumed.
 
-			for status in data:
-				yield status
-
-			if not max_id:
-				break
+		The next page is requested in a background thread as soon as its
+		max_id is known, so its round trip overlaps with the caller
+		processing the current page. At most one page request is in flight.
+		"""
+		pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bookmarks")
+		pending: Future | None = pool.submit(self._fetch_bookmarks_page)
+		try:
+			while pending is not None:
+				data, max_id = pending.result()
+				pending = None
+				if self.dump_raw:
+					# Printed here rather than in the prefetch thread, so the
+					# dump cannot interleave with the caller's progress output.
+					self._dump_page(data)
+				if not data:
+					break
+
+				if max_id:
+					pending = pool.submit(self._fetch_bookmarks_page, max_id=max_id)
+
+				yield from data
+		finally:
+			# Stopped early: do not wait for a prefetch nobody will read.
+			pool.shutdown(wait=False, cancel_futures=True)
 
 	def delete_bookmark(self, status_id: str):
 		"""Remove a bookmark for the given status ID."""
 		url = f"{self.inst.base_url}/api/v1/statuses/{status_id}/unbookmark"
-		r = requests.post(url, headers=self._auth_headers(), timeout=15)
+		r = self._session.post(url, timeout=15)
 		r.raise_for_status()
 
+	def delete_bookmarks(self, status_ids: Iterable[str]) -> Dict[str, Exception]:
+		"""
+		Remove bookmarks for several statuses using a few concurrent requests.
+		Every ID is attempted; returns the errors of the failed ones by ID.
+		"""
+		ids = list(status_ids)
+		failures: Dict[str, Exception] = {}
+		if not ids:
+			return failures
+
+		with ThreadPoolExecutor(max_workers=min(_DELETE_WORKERS, len(ids))) as pool:
+			futures = {pool.submit(self.delete_bookmark, status_id): status_id for status_id in ids}
+			for future in as_completed(futures):
+				error = future.exception()
+				if error is not None:
+					failures[futures[future]] = error
+		return failures
+
 	def _fetch_bookmarks_page(
 		self,
 		max_id: Optional[str] = None,
@@ -64,25 +137,25 @@ class MastodonAPI:
 		if max_id:
 			params["max_id"] = max_id
 
-		r = requests.get(url, headers=self._auth_headers(), params=params, timeout=15)
+		r = self._session.get(url, params=params, timeout=15)
 		r.raise_for_status()
 
-		data = r.json()
-		if self.dump_raw:
-			import json
-			import sys
-			print(json.dumps(data, ensure_ascii=False))
-			sys.stdout.flush()
+		# Parse the raw body bytes; orjson (when installed) skips the text decode.
+		data = loads(r.content)
 		next_max_id = self._parse_next_max_id(r.links)
 
 		return data, next_max_id
 
+	@staticmethod
+	def _dump_page(data: List[Dict[str, Any]]) -> None:
+		"""Write a bookmarks page to stdout as one JSON line (dump_raw)."""
+		sys.stdout.flush()
+		sys.stdout.buffer.write(dumps_line(data))
+		sys.stdout.buffer.flush()
+
 	def _auth_headers(self) -> Dict[str, str]:
-		"""Authorization headers for Mastodon API calls."""
-		return {
-			"Authorization": f"Bearer {self.inst.access_token}",
-			"User-Agent": USER_AGENT,
-		}
+		"""Authorization headers for Mastodon API calls (built once; do not mutate)."""
+		return self._headers
 
 	@staticmethod
 	def _parse_next_max_id(links: Dict[str, Any]) -> Optional[str]:
@@ -94,9 +167,16 @@ class MastodonAPI:
 		if not next_link:
 			return None
 
+		# Mastodon IDs are plain tokens, so a scan for the one parameter is
+		# enough (no URL parsing or query dict).
 		href = next_link.get("url") or ""
-		qs = parse_qs(urlparse(href).query)
-		vals = qs.get("max_id")
-		if not vals:
-			return None
-		return vals[0]
+		query = href.partition("?")[2].partition("#")[0]
+		if query.startswith("max_id="):
+			start = 7
+		else:
+			start = query.find("&max_id=")
+			if start < 0:
+				return None
+			start += 8
+		end = query.find("&", start)
+		return (query[start:] if end < 0 else query[start:end]) or None
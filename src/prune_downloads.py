@@ -5,34 +5,48 @@ and remove their entries from hashdb.jsonl.
 """
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
 from config import load_config
-from hashdb import JsonlHashDB
+from hashdb import open_hashdb
 
 
-def _normalize_target(download_root: Path, spec: str) -> Path:
+# Concurrent unlink calls when deleting the targeted files.
+_UNLINK_WORKERS = 16
+
+
+def _normalize_target(resolved_root: Path, spec: str) -> Path:
 	"""
-	Resolve user-supplied path specs into absolute paths under download_root.
+	Resolve user-supplied path specs into absolute paths under the download
+	root, which the caller resolves once (expanduser + resolve).
 	Rejects attempts to target the root itself or to escape the download tree.
 	"""
 	raw = Path(spec)
 	if raw.is_absolute():
 		target = raw
 	else:
-		target = download_root / raw
-	target = target.expanduser().resolve(strict=False)
+		target = resolved_root / raw
+	target = target.resolve(strict=False)
 
-	root = download_root.expanduser().resolve(strict=False)
-	if root == target:
+	if resolved_root == target:
 		raise ValueError("cannot target the download root itself")
-	if root not in target.parents:
-		raise ValueError(f"target {spec} is outside download directory {download_root}")
+	if resolved_root not in target.parents:
+		raise ValueError(f"target {spec} is outside download directory {resolved_root}")
 
 	return target
 
 
+def _try_unlink(target: Path) -> tuple[Path, bool]:
+	"""Delete one file; returns (target, False) when it does not exist."""
+	try:
+		target.unlink()
+	except FileNotFoundError:
+		return target, False
+	return target, True
+
+
 def main():
 	"""Entry point for the prune-downloads CLI utility."""
 	parser = argparse.ArgumentParser(
@@ -57,44 +71,37 @@ def main():
 		print(f"[ERROR] Failed to load config: {exc}")
 		return 1
 
-	download_root = Path(config.paths.download)
-	db = JsonlHashDB(
-		path=config.paths.hashdb_file,
-		removed_path=config.paths.removed_log_file,
-	)
+	resolved_root = Path(config.paths.download).expanduser().resolve(strict=False)
+	db = open_hashdb(config)
 
 	try:
-		targets = [
-			_normalize_target(download_root, spec)
+		# normalize and deduplicate in one pass, preserving order
+		unique_targets = list(dict.fromkeys(
+			_normalize_target(resolved_root, spec)
 			for spec in args.paths
-		]
+		))
 	except ValueError as exc:
 		print(f"[ERROR] {exc}")
 		return 1
 
-	# deduplicate while preserving order
-	seen = set()
-	unique_targets = []
-	for t in targets:
-		if t in seen:
-			continue
-		seen.add(t)
-		unique_targets.append(t)
-
 	removed_entries = db.delete_by_filepaths(unique_targets)
 	if removed_entries:
 		print(f"[INFO] Removed {len(removed_entries)} entries from hashdb")
 	else:
 		print("[WARN] No matching hashdb entries were found")
 
+	# Unlinks are independent metadata operations; overlap them, which
+	# matters on network filesystems. Results come back in target order.
+	with ThreadPoolExecutor(max_workers=min(_UNLINK_WORKERS, len(unique_targets))) as pool:
+		results = list(pool.map(_try_unlink, unique_targets))
+
 	deleted_files = 0
 	missing_files = 0
-	for target in unique_targets:
-		try:
-			target.unlink()
+	for target, deleted in results:
+		if deleted:
 			print(f"[OK] Deleted file: {target}")
 			deleted_files += 1
-		except FileNotFoundError:
+		else:
 			print(f"[WARN] File not found (hashdb entry removed if existed): {target}")
 			missing_files += 1
 
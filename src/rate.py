@@ -1,13 +1,26 @@
 import time
 
-from config import GlobalConfig
 
-
-def rate_sleep(config: GlobalConfig):
+class RateLimiter:
 	"""
-	Sleep for the currently configured download delay.
+	Space events at least delay_seconds apart, measured on the monotonic
+	clock from one wait() to the next.
 
-	This helper centralizes the rate-control delay so future logic
-	(e.g., jitter) can be added in one place.
+	Unlike sleeping the full delay after each download, time already spent
+	(e.g. downloading) counts toward the delay, so the configured rate is
+	what is actually achieved.
 	"""
-	time.sleep(config.download.rate.delay_seconds)
+
+	__slots__ = ("delay", "_next")
+
+	def __init__(self, delay_seconds: float):
+		self.delay = max(delay_seconds, 0.0)
+		self._next = time.monotonic()
+
+	def wait(self) -> None:
+		"""Sleep until the next slot is due, then reserve the one after it."""
+		now = time.monotonic()
+		if now < self._next:
+			time.sleep(self._next - now)
+			now = self._next
+		self._next = now + self.delay
@@ -0,0 +1,117 @@
+import atexit
+from pathlib import Path
+import sqlite3
+import time
+from typing import Optional, Dict, Any, Iterable, List
+import weakref
+
+from hashdb import normalize_path, normalize_stored_path
+from jsonl import AsyncJsonlWriter, dumps, loads
+
+
+# Writes are committed in batches: every _COMMIT_EVERY rows or _COMMIT_INTERVAL seconds.
+_COMMIT_EVERY = 64
+_COMMIT_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+	sha256 TEXT PRIMARY KEY,
+	filepath TEXT,
+	entry BLOB NOT NULL
+)
+"""
+
+
+class SqliteHashDB:
+	def __init__(self, path: Path, removed_path: Path):
+		"""
+		Store and query download metadata in a SQLite database (WAL mode).
+		Lookups hit the on-disk index, so startup does not load the history.
+		The removed log stays a JSONL file, as with JsonlHashDB.
+		"""
+		self.path = path
+		self.removed_path = removed_path
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._conn = sqlite3.connect(self.path)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute("PRAGMA synchronous=NORMAL")
+		self._conn.execute("PRAGMA temp_store=MEMORY")
+		self._conn.execute(_SCHEMA)
+		self._conn.commit()
+		self._pending = 0
+		self._last_commit = time.monotonic()
+		# Same background writer as JsonlHashDB, so removed.jsonl is flushed
+		# and ordered the same way whichever backend is configured.
+		self._writer = AsyncJsonlWriter()
+		_DATABASES.add(self)
+
+	def get(self, sha: str) -> Optional[Dict[str, Any]]:
+		"""Return the stored entry for the given sha256 hash, if any."""
+		row = self._conn.execute("SELECT entry FROM hashes WHERE sha256 = ?", (sha,)).fetchone()
+		if row is None:
+			return None
+		return loads(row[0])
+
+	def set(self, entry: Dict[str, Any]):
+		"""Insert or replace an entry; commits are batched."""
+		self._conn.execute(
+			"INSERT OR REPLACE INTO hashes (sha256, filepath, entry) VALUES (?, ?, ?)",
+			(entry["sha256"], entry.get("filepath"), dumps(entry)),
+		)
+		self._pending += 1
+		if self._pending >= _COMMIT_EVERY or time.monotonic() - self._last_commit >= _COMMIT_INTERVAL:
+			self._commit()
+
+	def log_removed(self, entry: Dict[str, Any]):
+		"""Append a record to the removed-log JSONL file."""
+		self._writer.append(self.removed_path, entry)
+
+	def flush(self):
+		"""Commit pending rows and write buffered removed-log records."""
+		self._commit()
+		self._writer.flush()
+
+	def close(self):
+		"""Commit pending rows and close the database and log files."""
+		if self._conn is None:
+			return
+		self._commit()
+		self._conn.close()
+		self._conn = None
+		self._writer.close()
+
+	def _commit(self):
+		self._conn.commit()
+		self._pending = 0
+		self._last_commit = time.monotonic()
+
+	def delete_by_filepaths(self, paths: Iterable[str | Path]) -> List[Dict[str, Any]]:
+		"""Remove entries matching the provided file paths."""
+		targets = {normalize_path(p) for p in paths}
+		if not targets:
+			return []
+
+		resolved_dirs: Dict[str, str] = {}
+		removed: List[Dict[str, Any]] = []
+		rows = self._conn.execute("SELECT sha256, filepath, entry FROM hashes WHERE filepath IS NOT NULL AND filepath != ''")
+		doomed = []
+		for sha, fp, entry in rows:
+			if normalize_stored_path(fp, resolved_dirs) in targets:
+				doomed.append((sha,))
+				removed.append(loads(entry))
+
+		if doomed:
+			self._conn.executemany("DELETE FROM hashes WHERE sha256 = ?", doomed)
+			self._commit()
+
+		return removed
+
+
+# Open databases, committed and closed at interpreter exit.
+_DATABASES: "weakref.WeakSet[SqliteHashDB]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_databases() -> None:
+	for db in list(_DATABASES):
+		db.close()
@@ -1,12 +1,27 @@
 from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict
 
+try:
+	from ciso8601 import parse_datetime as _parse_iso
+except ImportError:  # optional dependency
+	# Python 3.11+ accepts a trailing "Z" natively.
+	_parse_iso = datetime.fromisoformat
 
+
+@lru_cache(maxsize=4096)
 def parse_time(value: str) -> datetime:
 	"""
 	Parse an ISO8601 timestamp into a timezone-aware datetime.
 	Supports trailing 'Z' (UTC) and offset-aware strings.
+	Memoized: a status's created_at is parsed for its file path, its log
+	path and the duplicate check (datetimes are immutable, so sharing is safe).
 	"""
 	if not value:
 		raise ValueError("timestamp is empty")
-	value = value.replace("Z", "+00:00")
-	return datetime.fromisoformat(value)
+	return _parse_iso(value)
+
+
+def media_url(media: Dict[str, Any]) -> str | None:
+	"""Return the original (remote) URL of an attachment, or its local URL."""
+	return media.get("remote_url") or media.get("url")
@@ -5,3 +5,8 @@ ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
 	sys.path.insert(0, str(SRC))
+
+
+def pytest_configure(config):
+	# Lets disk-bound tests be selected or grouped, e.g. -m "not filesystem".
+	config.addinivalue_line("markers", "filesystem: test reads or writes files on disk")
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-from copy import deepcopy
-
 
 _DEFAULT_STATUS = {
 	"id": "status-1",
@@ -19,7 +17,12 @@ _DEFAULT_STATUS = {
 
 
 def make_status(**overrides) -> dict:
-	status = deepcopy(_DEFAULT_STATUS)
-	for key, val in overrides.items():
-		status[key] = val
+	# The default is two levels of dicts/lists of strings, so copying those
+	# containers gives an independent tree without copy.deepcopy.
+	status = {
+		**_DEFAULT_STATUS,
+		"account": dict(_DEFAULT_STATUS["account"]),
+		"media_attachments": [dict(m) for m in _DEFAULT_STATUS["media_attachments"]],
+	}
+	status.update(overrides)
 	return status
@@ -1,3 +1,5 @@
+import types
+
 import pytest
 
 from classify import (
@@ -5,6 +7,7 @@ from classify import (
 	classify_origin_group,
 	classify_account_host,
 	classify_account_group,
+	_matcher_for,
 )
 
 
@@ -14,6 +17,9 @@ from classify import (
 		("https://example.social/@user/1", "example.social"),
 		("https://cdn.example/media/file.png", "cdn.example"),
 		("not a url", ""),
+		("https://user@Media.Example:8443/path", "media.example"),
+		("https://cdn.example?query=1", "cdn.example"),
+		("https://[::1]:8080/file.png", "::1"),
 	],
 )
 def test_classify_origin_host_parses_hostname(url, expected):
@@ -42,3 +48,46 @@ def test_classify_account_host_falls_back_to_unknown_when_no_url():
 def test_classify_account_group_same_logic_as_origin_group():
 	assert classify_account_group("misskey.space") == "misskey"
 	assert classify_account_group("something") == "other"
+
+
+def test_classify_origin_group_first_matching_rule_wins():
+	config = types.SimpleNamespace(
+		rules=[
+			{"match": "*.example.com", "group": "demo"},
+			{"match": "cdn.*", "group": "cdn"},
+			{"match": "*", "group": "fallback"},
+		],
+	)
+
+	assert classify_origin_group("cdn.example.com", config) == "demo"
+	assert classify_origin_group("cdn.other.net", config) == "cdn"
+	assert classify_origin_group("misc.host", config) == "fallback"
+
+
+def test_classify_origin_group_orders_literal_suffix_and_glob_rules():
+	config = types.SimpleNamespace(
+		rules=[
+			{"match": "*cdn*", "group": "cdn"},
+			{"match": "media.example.com", "group": "exact"},
+			{"match": "*.example.com", "group": "suffix"},
+		],
+	)
+
+	assert classify_origin_group("cdn.example.com", config) == "cdn"
+	assert classify_origin_group("media.example.com", config) == "exact"
+	assert classify_origin_group("a.b.example.com", config) == "suffix"
+	assert classify_origin_group("example.com", config) == "other"
+
+
+def test_classify_reuses_matcher_and_results_for_materialized_rules():
+	rules = (("*.example.com", "demo"), ("*", "fallback"))
+	config = types.SimpleNamespace(materialized_rules=rules)
+
+	assert classify_origin_group("cdn.example.com", config) == "demo"
+	matcher = _matcher_for(rules)
+	assert matcher is _matcher_for(rules)
+	assert matcher.results == {"cdn.example.com": "demo"}
+
+	assert classify_origin_group("CDN.example.com", config) == "demo"
+	assert classify_origin_group("misc.host", config) == "fallback"
+	assert matcher.results["misc.host"] == "fallback"
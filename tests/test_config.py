@@ -2,19 +2,27 @@ import pytest
 import requests
 
 from config import (
+	ClassificationRule,
 	RateLimitConfig,
 	_parse_rate_per_minute,
+	_parse_rate_text,
 	_parse_delay_value,
 	load_config,
 	GlobalConfig,
 	InstanceConfig,
 )
 from classify import classify_origin_group, classify_account_group
-from filters import should_skip
+from filters import _looks_like_image, should_skip
 from fetch import run_instance
 import types
 
 
+@pytest.fixture
+def cfg():
+	"""Fresh default configuration (constructing one is cheaper than copying)."""
+	return GlobalConfig()
+
+
 def test_parse_rate_per_minute_string():
 	assert _parse_rate_per_minute("2/minute") == pytest.approx(2.0)
 	assert _parse_rate_per_minute("1/hour") == pytest.approx(1.0 / 60.0)
@@ -103,8 +111,7 @@ download:
 	assert filter_cfg.include_nsfw is False
 
 
-def test_default_classification_rules_apply():
-	cfg = GlobalConfig()
+def test_default_classification_rules_apply(cfg):
 	assert classify_origin_group("media.misskeyusercontent.com", cfg) == "misskey"
 	assert classify_account_group("unknown.host", cfg) == "other"
 
@@ -127,9 +134,17 @@ classify:
 
 	cfg = load_config(cfg_file)
 	assert cfg.classify.rules[0].match == "*.example.com"
+	assert cfg.classify.materialized_rules == (("*.example.com", "demo"), ("*", "fallback"))
 	assert classify_origin_group("cdn.EXAMPLE.com", cfg) == "demo"
 	assert classify_account_group("other.host", cfg) == "fallback"
 
+	# edits apply once the snapshot is refreshed
+	cfg.classify.rules.insert(0, ClassificationRule(match="other.host", group="pinned"))
+	assert classify_account_group("other.host", cfg) == "fallback"
+	cfg.classify.refresh_rules()
+	assert classify_account_group("other.host", cfg) == "pinned"
+	assert classify_origin_group("cdn.EXAMPLE.com", cfg) == "demo"
+
 
 def test_load_config_download_user_agent(tmp_path):
 	cfg_file = tmp_path / "config.yaml"
@@ -175,8 +190,7 @@ removed:
 	assert cfg.removed.skip_media_not_found_for is None
 
 
-def test_filter_flags_control_skip():
-	cfg = GlobalConfig()
+def test_filter_flags_control_skip(cfg):
 	cfg.download.filter.include_nsfw = False
 	cfg.download.filter.include_audio = False
 	cfg.download.filter.include_video = False
@@ -213,8 +227,7 @@ def test_filter_flags_control_skip():
 	assert should_skip(status_audio, inst, cfg) == (False, None)
 
 
-def test_try_unknown_media_respects_extensions():
-	cfg = GlobalConfig()
+def test_try_unknown_media_respects_extensions(cfg):
 	cfg.download.filter.include_video = False
 	inst = InstanceConfig(
 		name="test",
@@ -238,8 +251,29 @@ def test_try_unknown_media_respects_extensions():
 	assert should_skip(status_unknown, inst, cfg) == (False, None)
 
 
-def test_should_skip_self_posts_by_account_id():
-	cfg = GlobalConfig()
+def test_should_skip_mixed_media_types(cfg):
+	cfg.download.filter.include_gifv = True
+	cfg.download.filter.include_audio = True
+	cfg.download.filter.include_video = False
+	inst = InstanceConfig(name="test", base_url="https://example", access_token="token")
+
+	def status_with(*types):
+		return {
+			"id": "7",
+			"account": {"id": "1", "username": "bob"},
+			"media_attachments": [{"type": t, "remote_url": f"https://cdn/{i}"} for i, t in enumerate(types)],
+		}
+
+	assert should_skip(status_with("image", "audio"), inst, cfg) == (False, None)
+	assert should_skip(status_with("Image", None), inst, cfg) == (False, None)
+	assert should_skip(status_with("audio", "video"), inst, cfg) == (True, "non_image_media")
+	assert should_skip(status_with("image", "gifv"), inst, cfg) == (True, "non_image_media")
+
+	cfg.download.filter.include_gifv = False
+	assert should_skip(status_with("image", "gifv"), inst, cfg) == (True, "gifv_media")
+
+
+def test_should_skip_self_posts_by_account_id(cfg):
 	inst = InstanceConfig(
 		name="self",
 		base_url="https://example",
@@ -257,8 +291,7 @@ def test_should_skip_self_posts_by_account_id():
 	assert should_skip(status, inst, cfg) == (True, "self_post")
 
 
-def test_should_skip_self_posts_by_handle_case_insensitive():
-	cfg = GlobalConfig()
+def test_should_skip_self_posts_by_handle_case_insensitive(cfg):
 	inst = InstanceConfig(
 		name="self",
 		base_url="https://example",
@@ -280,8 +313,40 @@ def test_should_skip_self_posts_by_handle_case_insensitive():
 	assert should_skip(status, inst, cfg) == (True, "self_post")
 
 
-def test_include_self_flag_allows_self_posts():
-	cfg = GlobalConfig()
+def test_instance_config_derives_handle_target():
+	inst = InstanceConfig(
+		name="self",
+		base_url="https://example",
+		access_token="token",
+		account_handle="@User@Example.social",
+	)
+	assert inst.handle_target == "user@example.social"
+
+	plain = InstanceConfig(name="other", base_url="https://example", access_token="token")
+	assert plain.handle_target is None
+
+	# follows account_handle when it is assigned after construction
+	plain.account_handle = "@Bob"
+	assert plain.handle_target == "bob"
+
+
+def test_should_skip_checks_media_before_self_post(cfg):
+	inst = InstanceConfig(
+		name="self",
+		base_url="https://example",
+		access_token="token",
+		account_id="42",
+	)
+	status = {
+		"id": "6",
+		"account": {"id": "42", "username": "selfuser"},
+		"media_attachments": [],
+	}
+
+	assert should_skip(status, inst, cfg) == (True, "no_media")
+
+
+def test_include_self_flag_allows_self_posts(cfg):
 	cfg.download.filter.include_self = True
 	inst = InstanceConfig(
 		name="self",
@@ -300,8 +365,7 @@ def test_include_self_flag_allows_self_posts():
 	assert should_skip(status, inst, cfg) == (False, None)
 
 
-def test_thumbnail_only_filter_requires_remote_urls():
-	cfg = GlobalConfig()
+def test_thumbnail_only_filter_requires_remote_urls(cfg):
 	cfg.download.filter.include_thumbnail_only = False
 	inst = InstanceConfig(
 		name="thumb",
@@ -319,8 +383,7 @@ def test_thumbnail_only_filter_requires_remote_urls():
 	assert should_skip(status, inst, cfg) == (True, "no_remote_url")
 
 
-def test_include_thumbnail_only_allows_missing_remote_urls_when_try_unknown_enabled():
-	cfg = GlobalConfig()
+def test_include_thumbnail_only_allows_missing_remote_urls_when_try_unknown_enabled(cfg):
 	cfg.download.filter.include_thumbnail_only = True
 	cfg.download.filter.try_unknown_media = True
 	inst = InstanceConfig(
@@ -341,8 +404,7 @@ def test_include_thumbnail_only_allows_missing_remote_urls_when_try_unknown_enab
 	assert should_skip(status, inst, cfg) == (False, None)
 
 
-def test_missing_media_404_logged(monkeypatch, tmp_path):
-	cfg = GlobalConfig()
+def test_missing_media_404_logged(monkeypatch, tmp_path, cfg):
 	cfg.runtime.limit = 1
 	cfg.runtime.dry_run = False
 	cfg.logging.log_removed = True
@@ -379,6 +441,9 @@ def test_missing_media_404_logged(monkeypatch, tmp_path):
 			for s in self.data:
 				yield s
 
+		def close(self):
+			pass
+
 	removed = []
 	dummy_db = types.SimpleNamespace(
 		get=lambda sha: None,
@@ -394,7 +459,7 @@ def test_missing_media_404_logged(monkeypatch, tmp_path):
 		raise error
 
 	monkeypatch.setattr("fetch.download_and_sha256", fake_download)
-	monkeypatch.setattr("fetch.time.sleep", lambda delay: None)
+	monkeypatch.setattr("rate.time.sleep", lambda delay: None)
 
 	api = DummyAPI(statuses)
 
@@ -404,8 +469,7 @@ def test_missing_media_404_logged(monkeypatch, tmp_path):
 	assert removed[0]["reason"] == "media_not_found"
 
 
-def test_progress_label_formatting(monkeypatch, tmp_path):
-	cfg = GlobalConfig()
+def test_progress_label_formatting(monkeypatch, tmp_path, cfg):
 	cfg.download.progress_level = "filesize"
 	cfg.download.rate.delay_seconds = 0
 	cfg.runtime.limit = 3
@@ -451,6 +515,9 @@ def test_progress_label_formatting(monkeypatch, tmp_path):
 			for s in self.data:
 				yield s
 
+		def close(self):
+			pass
+
 	dummy_db = types.SimpleNamespace(
 		get=lambda sha: None,
 		set=lambda record: None,
@@ -466,7 +533,7 @@ def test_progress_label_formatting(monkeypatch, tmp_path):
 		return str(tmp_file), "sha", 10
 
 	monkeypatch.setattr("fetch.download_and_sha256", fake_download)
-	monkeypatch.setattr("fetch.time.sleep", lambda delay: None)
+	monkeypatch.setattr("rate.time.sleep", lambda delay: None)
 
 	api = DummyAPI(statuses)
 
@@ -475,3 +542,102 @@ def test_progress_label_formatting(monkeypatch, tmp_path):
 	assert progress_labels[0] == "[mastodon] 1/3 media 1/2"
 	assert progress_labels[1] == "[mastodon] 1/3 media 2/2"
 	assert progress_labels[2] == "[mastodon] 2/3 media"
+
+
+def test_parse_helpers_cache_repeated_inputs():
+	_parse_rate_text.cache_clear()
+	first = _parse_rate_per_minute("4/minute")
+	second = _parse_rate_per_minute("4/minute")
+
+	assert first == second == pytest.approx(4.0)
+	assert _parse_rate_text.cache_info().hits >= 1
+
+
+@pytest.mark.parametrize("value", [["5 seconds"], {"a": 1}])
+def test_parsers_reject_unhashable_values_by_type(value):
+	with pytest.raises(TypeError, match="Unsupported delay value type"):
+		_parse_delay_value(value)
+	with pytest.raises(TypeError, match="Unsupported rate value type"):
+		_parse_rate_per_minute(value)
+
+
+def test_load_config_instances_overrides(tmp_path):
+	cfg_file = tmp_path / "config.yaml"
+	cfg_file.write_text(
+		"""
+instances:
+  - name: first
+    base_url: https://first.example
+    access_token: token1
+    account_screen_name: alice
+    unbookmark: false
+    rate: "4/minute"
+  - name: second
+    base_url: https://second.example
+    access_token: token2
+    unbookmark_override: true
+    rate_override: 2
+""",
+		encoding="utf-8",
+	)
+
+	cfg = load_config(cfg_file)
+	first, second = cfg.instances
+	assert first.account_handle == "alice"
+	assert first.unbookmark_override is False
+	assert first.delay_seconds_override == pytest.approx(15.0)
+	assert second.unbookmark_override is True
+	assert second.delay_seconds_override == pytest.approx(30.0)
+
+
+def test_load_config_download_concurrency(tmp_path):
+	cfg_file = tmp_path / "config.yaml"
+	cfg_file.write_text(
+		"""
+download:
+  concurrency: 4
+""",
+		encoding="utf-8",
+	)
+
+	cfg = load_config(cfg_file)
+	assert cfg.download.concurrency == 4
+
+	cfg_file.write_text("download:\n  concurrency: 0\n", encoding="utf-8")
+	with pytest.raises(ValueError):
+		load_config(cfg_file)
+
+
+@pytest.mark.parametrize(
+	("url", "expected"),
+	[
+		("https://cdn.example/media/photo.PNG", True),
+		("https://cdn.example/media/photo.jpeg?size=large", True),
+		("https://cdn.example/media/.avif", True),
+		("https://cdn.example/media/clip.mp4", False),
+		("https://cdn.example/media/png", False),
+		("", False),
+	],
+)
+def test_looks_like_image_checks_url_suffix(url, expected):
+	assert _looks_like_image({"url": url}) is expected
+
+
+def test_load_config_hashdb_backend(tmp_path):
+	path = tmp_path / "config.yaml"
+	path.write_text("hashdb:\n  backend: SQLite\n", encoding="utf-8")
+	assert load_config(path).hashdb.backend == "sqlite"
+
+	path.write_text("hashdb:\n  backend: redis\n", encoding="utf-8")
+	with pytest.raises(ValueError):
+		load_config(path)
+
+
+def test_load_config_hash_algorithm(tmp_path):
+	path = tmp_path / "config.yaml"
+	path.write_text("download:\n  hash_algorithm: BLAKE3\n", encoding="utf-8")
+	assert load_config(path).download.hash_algorithm == "blake3"
+
+	path.write_text("download:\n  hash_algorithm: md5\n", encoding="utf-8")
+	with pytest.raises(ValueError):
+		load_config(path)
@@ -1,11 +1,12 @@
 import hashlib
 from pathlib import Path
+import types
 
 import pytest
 import requests
 
 from config import GlobalConfig
-from downloader import _format_bytes, _attempt_download, download_and_sha256
+from downloader import _format_bytes, _attempt_download, _get_session, download_and_sha256
 
 
 @pytest.mark.parametrize(
@@ -32,45 +33,186 @@ def test_attempt_download_writes_file_and_hash(monkeypatch):
 	cfg.download.progress_level = "off"
 
 	chunks = [b"hello ", b"world"]
+	class DummyRaw:
+		def __init__(self):
+			self.pending = list(chunks)
+			self.decode_content = False
+
+		def readinto(self, buf):
+			if not self.pending:
+				return 0
+			chunk = self.pending.pop(0)
+			buf[:len(chunk)] = chunk
+			return len(chunk)
+
 	class DummyResponse:
 		def __init__(self):
 			self.headers = {"content-length": str(sum(len(c) for c in chunks))}
+			self.raw = DummyRaw()
 
 		def raise_for_status(self):
 			pass
 
-		def iter_content(self, chunk_size):
-			for chunk in chunks:
-				yield chunk
+		def close(self):
+			pass
 
 	def fake_get(url, stream=True, timeout=15, headers=None):
 		return DummyResponse()
 
-	monkeypatch.setattr("downloader.requests.get", fake_get)
+	monkeypatch.setattr("downloader._get_session", lambda *a: types.SimpleNamespace(get=fake_get))
+
+	# Record how the body is fed to the hasher: one update per chunk read,
+	# never a joined copy of the whole body.
+	updates = []
+
+	class RecordingHasher:
+		def __init__(self):
+			self.inner = hashlib.sha256()
+
+		def update(self, data):
+			updates.append(bytes(data))
+			self.inner.update(data)
+
+		def hexdigest(self):
+			return self.inner.hexdigest()
+
+	monkeypatch.setattr("downloader._new_hasher", lambda algorithm: RecordingHasher())
 
 	tmp_path, sha256, size = _attempt_download("https://example/file", cfg, progress_label=None)
 
 	assert size == sum(len(c) for c in chunks)
-	expected_hash = hashlib.sha256(b"".join(chunks)).hexdigest()
-	assert sha256 == expected_hash
+	expected = hashlib.sha256()
+	for chunk in chunks:
+		expected.update(chunk)
+	assert sha256 == expected.hexdigest()
+	assert updates == chunks
 	assert Path(tmp_path).read_bytes() == b"".join(chunks)
 	Path(tmp_path).unlink()
 
 
+def test_attempt_download_throttles_progress_updates(monkeypatch, capsys):
+	cfg = GlobalConfig()
+	cfg.download.progress_level = "filesize"
+
+	chunks = [b"a" * 10, b"b" * 10, b"c" * 10]
+	class DummyRaw:
+		decode_content = False
+
+		def readinto(self, buf):
+			if not chunks:
+				return 0
+			chunk = chunks.pop(0)
+			buf[:len(chunk)] = chunk
+			return len(chunk)
+
+	class DummyResponse:
+		headers = {"content-length": "30"}
+		raw = DummyRaw()
+
+		def raise_for_status(self):
+			pass
+
+		def close(self):
+			pass
+
+	monkeypatch.setattr(
+		"downloader._get_session",
+		lambda *a: types.SimpleNamespace(get=lambda *a, **kw: DummyResponse()),
+	)
+	monkeypatch.setattr("downloader.time.monotonic", lambda: 100.0)
+
+	tmp_path, _, size = _attempt_download("https://example/file", cfg, progress_label="[x]")
+	Path(tmp_path).unlink()
+
+	out = capsys.readouterr().out
+	assert size == 30
+	assert out.count("\r") == 2
+	assert out.rstrip().endswith("[x] 30 B/30 B (100.0%)")
+
+
+def _chunked_response(chunks, headers, error=None):
+	pending = list(chunks)
+	closed = []
+
+	class DummyRaw:
+		decode_content = False
+
+		def readinto(self, buf):
+			if not pending:
+				if error is not None:
+					raise error
+				return 0
+			chunk = pending.pop(0)
+			buf[:len(chunk)] = chunk
+			return len(chunk)
+
+	return types.SimpleNamespace(
+		headers=headers,
+		raw=DummyRaw(),
+		raise_for_status=lambda: None,
+		close=lambda: closed.append(True),
+		closed=closed,
+	)
+
+
+def test_attempt_download_truncates_short_preallocated_body(monkeypatch):
+	cfg = GlobalConfig()
+	cfg.download.progress_level = "off"
+	response = _chunked_response([b"abc"], {"content-length": "4096"})
+	monkeypatch.setattr(
+		"downloader._get_session",
+		lambda *a: types.SimpleNamespace(get=lambda *a, **kw: response),
+	)
+
+	tmp_path, _, size = _attempt_download("https://example/file", cfg, progress_label=None)
+
+	assert size == 3
+	assert Path(tmp_path).read_bytes() == b"abc"
+	assert response.closed == [True]
+	Path(tmp_path).unlink()
+
+
+def test_attempt_download_removes_temp_file_on_stream_error(monkeypatch, tmp_path):
+	cfg = GlobalConfig()
+	cfg.download.progress_level = "off"
+	error = requests.exceptions.ChunkedEncodingError("cut")
+	response = _chunked_response([b"abc"], {"content-length": "10"}, error=error)
+	monkeypatch.setattr(
+		"downloader._get_session",
+		lambda *a: types.SimpleNamespace(get=lambda *a, **kw: response),
+	)
+	monkeypatch.setattr("downloader.tempfile.tempdir", str(tmp_path))
+
+	with pytest.raises(requests.exceptions.ChunkedEncodingError):
+		_attempt_download("https://example/file", cfg, progress_label=None)
+
+	assert list(tmp_path.iterdir()) == []
+	assert response.closed == [True]
+
+
 def test_attempt_download_propagates_http_error(monkeypatch):
 	cfg = GlobalConfig()
 
 	class ErrResponse:
+		closed = False
+
 		def raise_for_status(self):
 			raise requests.HTTPError("boom")
 
+		def close(self):
+			self.closed = True
+
+	response = ErrResponse()
+
 	def fake_get(url, stream=True, timeout=15, headers=None):
-		return ErrResponse()
+		return response
 
-	monkeypatch.setattr("downloader.requests.get", fake_get)
+	monkeypatch.setattr("downloader._get_session", lambda *a: types.SimpleNamespace(get=fake_get))
 
 	with pytest.raises(requests.HTTPError):
 		_attempt_download("https://example/file", cfg, progress_label=None)
+	# the pooled connection is released even though the body is never read
+	assert response.closed is True
 
 
 def test_download_and_sha256_retries_then_succeeds(monkeypatch):
@@ -84,7 +226,7 @@ def test_download_and_sha256_retries_then_succeeds(monkeypatch):
 	def fake_attempt(url, config, label):
 		call_count["value"] += 1
 		if call_count["value"] < 2:
-			raise requests.ConnectionError("fail once")
+			raise requests.exceptions.ChunkedEncodingError("fail once")
 		return "/tmp/file", "deadbeef", 10
 
 	monkeypatch.setattr("downloader._attempt_download", fake_attempt)
@@ -102,11 +244,86 @@ def test_download_and_sha256_raises_after_exhausting(monkeypatch):
 	cfg.download.retry.rate_control = True
 	cfg.download.rate.delay_seconds = 0
 
-	monkeypatch.setattr(
-		"downloader._attempt_download",
-		lambda url, config, label: (_ for _ in ()).throw(requests.HTTPError("boom")),
-	)
+	calls = []
+
+	def fake_attempt(url, config, label):
+		calls.append(url)
+		raise requests.exceptions.ChunkedEncodingError("cut")
+
+	monkeypatch.setattr("downloader._attempt_download", fake_attempt)
 	monkeypatch.setattr("downloader.time.sleep", lambda delay: (_ := delay))
 
+	with pytest.raises(requests.exceptions.ChunkedEncodingError):
+		download_and_sha256("https://example/file", cfg)
+	assert len(calls) == cfg.download.retry.max_attempts
+
+
+def test_download_and_sha256_does_not_retry_http_errors(monkeypatch):
+	cfg = GlobalConfig()
+	cfg.download.retry.max_attempts = 3
+
+	calls = []
+
+	def fake_attempt(url, config, label):
+		calls.append(url)
+		raise requests.HTTPError("not found")
+
+	monkeypatch.setattr("downloader._attempt_download", fake_attempt)
+
 	with pytest.raises(requests.HTTPError):
 		download_and_sha256("https://example/file", cfg)
+	assert len(calls) == 1
+
+
+def test_get_session_configures_fixed_delay_retry():
+	session = _get_session(3, 7.5)
+	retry = session.get_adapter("https://example/file").max_retries
+
+	assert retry.total == 2
+	assert 503 in retry.status_forcelist
+	assert retry.respect_retry_after_header is True
+	assert retry.increment("GET", "/file").get_backoff_time() == pytest.approx(7.5)
+
+
+def test_attempt_download_uses_blake3_with_prefix(monkeypatch):
+	cfg = GlobalConfig()
+	cfg.download.progress_level = "off"
+	cfg.download.hash_algorithm = "blake3"
+
+	class FakeBlake3:
+		AUTO = -1
+
+		def __init__(self, max_threads=1):
+			self.inner = hashlib.sha256()
+
+		def update(self, data):
+			self.inner.update(data)
+
+		def hexdigest(self):
+			return self.inner.hexdigest()
+
+	monkeypatch.setattr("downloader.blake3", types.SimpleNamespace(blake3=FakeBlake3))
+	response = _chunked_response([b"abc"], {})
+	monkeypatch.setattr(
+		"downloader._get_session",
+		lambda *a: types.SimpleNamespace(get=lambda *a, **kw: response),
+	)
+
+	tmp_path, digest, _ = _attempt_download("https://example/file", cfg, progress_label=None)
+	Path(tmp_path).unlink()
+
+	assert digest == "b3-" + hashlib.sha256(b"abc").hexdigest()
+
+
+def test_attempt_download_requires_blake3_package(monkeypatch):
+	cfg = GlobalConfig()
+	cfg.download.hash_algorithm = "blake3"
+	monkeypatch.setattr("downloader.blake3", None)
+	response = _chunked_response([b"abc"], {})
+	monkeypatch.setattr(
+		"downloader._get_session",
+		lambda *a: types.SimpleNamespace(get=lambda *a, **kw: response),
+	)
+
+	with pytest.raises(RuntimeError, match="blake3"):
+		_attempt_download("https://example/file", cfg, progress_label=None)
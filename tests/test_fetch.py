@@ -1,18 +1,25 @@
 import datetime
+import itertools
 import json
 from pathlib import Path
+import threading
+import types
 
+import pytest
 import requests
 
 from config import GlobalConfig, InstanceConfig
 from filenames import build_log_path
+import fetch
 from fetch import (
 	RemovedMediaTracker,
 	_safe_parse_created,
 	_guess_extension,
+	flush_logs,
 	log_download,
 	log_removed,
 	process_status,
+	run_instance,
 )
 from helpers import make_status
 
@@ -34,6 +41,9 @@ class DummyDB:
 	def log_removed(self, record):
 		self.logged.append(record)
 
+	def flush(self):
+		pass
+
 
 class DummyTracker:
 	def __init__(self, skipped=None):
@@ -47,43 +57,108 @@ class DummyTracker:
 		self.recorded.extend(urls)
 
 
+# A hashdb record for the same content the download_stub default produces.
+_EXISTING_TEMPLATE = {"sha256": "abc123"}
+
+
 def _make_config(tmp_path: Path, dry_run: bool = False) -> GlobalConfig:
 	cfg = GlobalConfig()
 	cfg.runtime.dry_run = dry_run
-	cfg.paths.download = tmp_path / "download"
-	cfg.paths.logs = tmp_path / "logs"
-	cfg.paths.tmp = tmp_path / "tmp"
-	cfg.paths.archive = tmp_path / "archive"
-	for p in [cfg.paths.download, cfg.paths.logs, cfg.paths.tmp, cfg.paths.archive]:
-		p.mkdir(parents=True, exist_ok=True)
+	# tmp_path already exists, so each directory is a single mkdir.
+	for name in ("download", "logs", "tmp", "archive"):
+		p = tmp_path / name
+		p.mkdir(exist_ok=True)
+		setattr(cfg.paths, name, p)
 	return cfg
 
 
+@pytest.fixture(scope="module")
+def inst():
+	# Read-only in every test, so one instance serves the whole module.
+	return InstanceConfig(
+		name="inst",
+		base_url="https://example",
+		access_token="token",
+	)
+
+
+@pytest.fixture
+def cfg(tmp_path):
+	return _make_config(tmp_path)
+
+
+@pytest.fixture(scope="module")
+def status_template():
+	# Shared by tests that only read the status; process_status and the log
+	# helpers never mutate it.
+	return make_status()
+
+
+@pytest.fixture
+def base_status():
+	# A private copy for tests that edit the status.
+	return make_status()
+
+
+@pytest.fixture(scope="module")
+def http_404():
+	response = requests.Response()
+	response.status_code = 404
+	return requests.HTTPError(response=response)
+
+
+@pytest.fixture(scope="module")
+def make_tracker(tmp_path_factory):
+	# Each call gets its own log (and sidecar) in one shared directory.
+	base = tmp_path_factory.mktemp("removed")
+	counter = itertools.count()
+
+	def _make(entries, ttl):
+		path = base / f"r{next(counter)}.jsonl"
+		path.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
+		return RemovedMediaTracker(path, ttl)
+
+	return _make
+
+
+@pytest.fixture
+def patch_fetch(monkeypatch):
+	"""Replace several fetch module attributes in one call."""
+	def _apply(**attrs):
+		for name, value in attrs.items():
+			monkeypatch.setattr(fetch, name, value)
+	return _apply
+
+
+@pytest.fixture
+def download_stub(monkeypatch, tmp_path):
+	"""
+	Patch fetch.download_and_sha256 once per test. By default it writes a
+	one-byte tmpfile hashed as stub["sha"]; set stub["func"] to take over,
+	called as func(url, config, progress_label, tmpfile).
+	"""
+	stub = {"func": None, "tmpfile": tmp_path / "temp.bin", "sha": "abc123"}
+
+	def dispatcher(url, config, progress_label=None):
+		tmpfile = stub["tmpfile"]
+		if stub["func"] is not None:
+			return stub["func"](url, config, progress_label, tmpfile)
+		tmpfile.write_bytes(b"x")
+		return str(tmpfile), stub["sha"], 1
+
+	monkeypatch.setattr(fetch, "download_and_sha256", dispatcher)
+	return stub
+
+
 def _run_process_status(
 	status,
 	inst,
 	db,
 	cfg,
-	monkeypatch,
-	tmp_path,
-	sha="abc123",
-	download_func=None,
+	download_stub,
 	return_tmp=False,
 	removed_tracker=None,
 ):
-	tmpfile = tmp_path / "temp.bin"
-
-	def default_download(url, config, progress_label=None):
-		tmpfile.write_bytes(b"x")
-		return str(tmpfile), sha, 1
-
-	def wrapper(url, config, progress_label=None):
-		if download_func is not None:
-			return download_func(url, config, progress_label, tmpfile)
-		return default_download(url, config, progress_label)
-
-	monkeypatch.setattr("fetch.download_and_sha256", wrapper)
-
 	result = process_status(
 		status,
 		inst,
@@ -96,7 +171,7 @@ def _run_process_status(
 		removed_tracker=removed_tracker,
 	)
 
-	tmp_value = tmpfile if return_tmp else None
+	tmp_value = download_stub["tmpfile"] if return_tmp else None
 	return result, tmp_value
 
 
@@ -106,94 +181,56 @@ def test_safe_parse_created_returns_datetime_for_valid_iso():
 	assert result == datetime.datetime(2023, 5, 1, 12, 34, 56, tzinfo=datetime.timezone.utc)
 
 
-def test_safe_parse_created_returns_none_on_empty_or_none():
-	assert _safe_parse_created(None) is None
-	assert _safe_parse_created("") is None
+@pytest.mark.parametrize("value", [None, ""])
+def test_safe_parse_created_returns_none_on_empty_or_none(value):
+	assert _safe_parse_created(value) is None
 
 
 def test_safe_parse_created_returns_none_for_invalid_format():
 	assert _safe_parse_created("not-a-date") is None
 
 
-def test_guess_extension_uses_remote_url_suffix_case_insensitive():
-	media = {"remote_url": "https://cdn.example/path/IMAGE.PNG"}
-	assert _guess_extension(media) == "png"
-
-
-def test_guess_extension_falls_back_to_media_type_suffix():
-	media = {"remote_url": "", "type": "video/mp4"}
-	assert _guess_extension(media) == "mp4"
-
-
-def test_guess_extension_defaults_to_png_for_unknown_image():
-	media = {"type": "image"}
-	assert _guess_extension(media) == "png"
-
-
-def test_process_status_keep_old_logs_duplicate_younger(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	cfg.archive.policy = "keep_old"
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	existing = {
-		"sha256": "abc123",
-		"created_at": "2023-01-01T00:00:00Z",
-		"filepath": str(tmp_path / "existing.png"),
-	}
-	db = DummyDB(existing)
-
-	status = make_status(created_at="2023-01-02T00:00:00Z")
-
-	_run_process_status(status, inst, db, cfg, monkeypatch, tmp_path)
-
-	assert db.logged
-	assert db.logged[0]["reason"] == "duplicate_younger"
-	assert not db.set_calls
-
-
-def test_process_status_latest_logs_duplicate_newer(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	cfg.archive.policy = "latest"
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	existing = {
-		"sha256": "abc123",
-		"created_at": "2023-01-01T00:00:00Z",
-		"filepath": str(tmp_path / "existing.png"),
-	}
-	db = DummyDB(existing)
-
-	status = make_status(created_at="2023-01-02T00:00:00Z")
-
-	_run_process_status(status, inst, db, cfg, monkeypatch, tmp_path)
-
-	assert db.logged
-	assert db.logged[0]["reason"] == "duplicate_newer"
-	assert not db.set_calls
-
-
-def test_process_status_latest_replaces_when_new_status_is_older(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	cfg.archive.policy = "latest"
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	existing = {
-		"sha256": "abc123",
-		"created_at": "2023-01-02T00:00:00Z",
-		"filepath": str(tmp_path / "existing.png"),
-	}
+@pytest.mark.parametrize(
+	"media,expected",
+	[
+		# remote_url suffix wins and is lowercased
+		({"remote_url": "https://cdn.example/path/IMAGE.PNG"}, "png"),
+		# falls back to the media type suffix
+		({"remote_url": "", "type": "video/mp4"}, "mp4"),
+		# unknown image type defaults to png
+		({"type": "image"}, "png"),
+	],
+)
+def test_guess_extension(media, expected):
+	assert _guess_extension(media) == expected
+
+
+@pytest.mark.filesystem
+@pytest.mark.parametrize(
+	"policy,existing_ts,status_ts,expected_reason,expect_replace",
+	[
+		("keep_old", "2023-01-01T00:00:00Z", "2023-01-02T00:00:00Z", "duplicate_younger", False),
+		("latest", "2023-01-01T00:00:00Z", "2023-01-02T00:00:00Z", "duplicate_newer", False),
+		("latest", "2023-01-02T00:00:00Z", "2023-01-01T00:00:00Z", None, True),
+	],
+)
+def test_process_status_duplicate_policy(
+	cfg,
+	inst,
+	download_stub,
+	patch_fetch,
+	tmp_path,
+	policy,
+	existing_ts,
+	status_ts,
+	expected_reason,
+	expect_replace,
+):
+	cfg.archive.policy = policy
+	existing = {**_EXISTING_TEMPLATE, "created_at": existing_ts, "filepath": str(tmp_path / "existing.png")}
 	db = DummyDB(existing)
 
-	status = make_status(created_at="2023-01-01T00:00:00Z")
+	status = make_status(created_at=status_ts)
 
 	calls = []
 	def fake_replace(
@@ -207,6 +244,8 @@ def test_process_status_latest_replaces_when_new_status_is_older(monkeypatch, tm
 		origin_group,
 		account_host,
 		account_group,
+		builder=None,
+		media_urls=None,
 	):
 		calls.append(
 			{
@@ -217,38 +256,33 @@ def test_process_status_latest_replaces_when_new_status_is_older(monkeypatch, tm
 		)
 		Path(tmpfile).unlink(missing_ok=True)
 
-	monkeypatch.setattr("fetch.replace_existing", fake_replace)
+	patch_fetch(replace_existing=fake_replace)
 
-	_run_process_status(status, inst, db, cfg, monkeypatch, tmp_path)
+	_run_process_status(status, inst, db, cfg, download_stub)
 
-	assert calls
-	assert not db.logged
+	if expect_replace:
+		assert calls
+		assert not db.logged
+	else:
+		assert not calls
+		assert db.logged
+		assert db.logged[0]["reason"] == expected_reason
+		assert not db.set_calls
 
 
-def test_process_status_logs_duplicate_unknown_when_created_missing(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	existing = {
-		"sha256": "abc123",
-		"created_at": "2023-01-01T00:00:00Z",
-		"filepath": str(tmp_path / "existing.png"),
-	}
+@pytest.mark.filesystem
+def test_process_status_logs_duplicate_unknown_when_created_missing(cfg, inst, base_status, tmp_path, download_stub):
+	existing = {**_EXISTING_TEMPLATE, "created_at": "2023-01-01T00:00:00Z", "filepath": str(tmp_path / "existing.png")}
 	db = DummyDB(existing)
 
-	status = make_status()
-	status["created_at"] = None
+	base_status["created_at"] = None
 
 	_, tmpfile = _run_process_status(
-		status,
+		base_status,
 		inst,
 		db,
 		cfg,
-		monkeypatch,
-		tmp_path,
+		download_stub,
 		return_tmp=True,
 	)
 
@@ -258,21 +292,9 @@ def test_process_status_logs_duplicate_unknown_when_created_missing(monkeypatch,
 	assert not tmpfile.exists()
 
 
-def test_process_status_skip_logs_removed(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	status = make_status()
-
+@pytest.mark.filesystem
+def test_process_status_skip_logs_removed(cfg, inst, status_template, patch_fetch, download_stub):
 	log_reasons = []
-	monkeypatch.setattr(
-		"fetch.should_skip",
-		lambda status_arg, inst_arg, cfg_arg: (True, "forced_skip"),
-	)
-
 	def fake_log_removed(
 		db,
 		status_arg,
@@ -284,10 +306,14 @@ def test_process_status_skip_logs_removed(monkeypatch, tmp_path):
 		account_host,
 		account_group,
 		config,
+		media_urls=None,
 	):
 		log_reasons.append(reason)
 
-	monkeypatch.setattr("fetch.log_removed", fake_log_removed)
+	patch_fetch(
+		should_skip=lambda status_arg, inst_arg, cfg_arg: (True, "forced_skip"),
+		log_removed=fake_log_removed,
+	)
 
 	download_called = {"flag": False}
 
@@ -295,47 +321,38 @@ def test_process_status_skip_logs_removed(monkeypatch, tmp_path):
 		download_called["flag"] = True
 		raise AssertionError("should not download when skipped")
 
+	download_stub["func"] = download_override
+
 	_run_process_status(
-		status,
+		status_template,
 		inst,
 		db=DummyDB(),
 		cfg=cfg,
-		monkeypatch=monkeypatch,
-		tmp_path=tmp_path,
-		download_func=download_override,
+		download_stub=download_stub,
 	)
 
 	assert log_reasons == ["forced_skip"]
 	assert download_called["flag"] is False
 
 
-def test_process_status_logs_media_not_found(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	status = make_status()
+@pytest.mark.filesystem
+def test_process_status_logs_media_not_found(cfg, inst, status_template, download_stub, http_404):
 	db = DummyDB()
 
 	calls = []
 
-	response = requests.Response()
-	response.status_code = 404
-
 	def failing_download(url, config, progress_label, tmpfile):
 		calls.append(url)
-		raise requests.HTTPError(response=response)
+		raise http_404
+
+	download_stub["func"] = failing_download
 
 	result, _ = _run_process_status(
-		status,
+		status_template,
 		inst,
 		db,
 		cfg,
-		monkeypatch,
-		tmp_path,
-		download_func=failing_download,
+		download_stub,
 	)
 
 	assert result is False
@@ -344,28 +361,22 @@ def test_process_status_logs_media_not_found(monkeypatch, tmp_path):
 	assert calls == ["https://cdn.example/media/file.png"]
 
 
-def test_process_status_skips_urls_marked_missing(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	status = make_status()
+@pytest.mark.filesystem
+def test_process_status_skips_urls_marked_missing(cfg, inst, status_template, download_stub):
 	db = DummyDB()
 	tracker = DummyTracker(skipped={"https://cdn.example/media/file.png"})
 
 	def failing_download(url, config, progress_label, tmpfile):
 		raise AssertionError("download should not run when tracker skips")
 
+	download_stub["func"] = failing_download
+
 	result, _ = _run_process_status(
-		status,
+		status_template,
 		inst,
 		db,
 		cfg,
-		monkeypatch,
-		tmp_path,
-		download_func=failing_download,
+		download_stub,
 		removed_tracker=tracker,
 	)
 
@@ -373,50 +384,155 @@ def test_process_status_skips_urls_marked_missing(monkeypatch, tmp_path):
 	assert not db.logged
 
 
-def test_process_status_records_media_not_found_in_tracker(monkeypatch, tmp_path):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	status = make_status()
+@pytest.mark.filesystem
+def test_process_status_records_media_not_found_in_tracker(cfg, inst, status_template, download_stub, http_404):
 	db = DummyDB()
 	tracker = DummyTracker()
 
-	response = requests.Response()
-	response.status_code = 404
-
 	def failing_download(url, config, progress_label, tmpfile):
-		raise requests.HTTPError(response=response)
+		raise http_404
+
+	download_stub["func"] = failing_download
 
 	_run_process_status(
-		status,
+		status_template,
 		inst,
 		db,
 		cfg,
-		monkeypatch,
-		tmp_path,
-		download_func=failing_download,
+		download_stub,
 		removed_tracker=tracker,
 	)
 
 	assert tracker.recorded == ["https://cdn.example/media/file.png"]
 
 
-def test_log_removed_records_entry_when_not_dry_run():
-	cfg = GlobalConfig()
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
+@pytest.mark.filesystem
+def test_process_status_downloads_media_concurrently(cfg, inst, patch_fetch, tmp_path):
+	cfg.download.concurrency = 2
+	status = make_status(
+		media_attachments=[
+			{"type": "image", "remote_url": "https://cdn.example/media/a.png"},
+			{"type": "image", "remote_url": "https://cdn.example/media/b.png"},
+		],
 	)
-	status = make_status()
+	db = DummyDB()
+
+	def download(url, config, progress_label=None):
+		name = url.rsplit("/", 1)[-1]
+		tmpfile = tmp_path / f"{name}.tmp"
+		tmpfile.write_bytes(name.encode())
+		return str(tmpfile), name, 1
+
+	patch_fetch(download_and_sha256=download)
+
+	result = process_status(
+		status,
+		inst,
+		api=None,
+		db=db,
+		config=cfg,
+		progress_mode="off",
+		status_idx=1,
+		total_label="1",
+	)
+
+	assert result is True
+	assert [record["sha256"] for record in db.set_calls] == ["a.png", "b.png"]
+	assert all(Path(record["filepath"]).exists() for record in db.set_calls)
+
+
+def test_run_instance_downloads_next_status_while_storing(cfg, inst, patch_fetch, tmp_path):
+	cfg.download.concurrency = 2
+	cfg.download.rate.delay_seconds = 0
+	cfg.runtime.limit = 3
+	cfg.runtime.unbookmark = True
+	statuses = [
+		make_status(
+			id=str(n),
+			media_attachments=[{"type": "image", "remote_url": f"https://cdn.example/media/{n}.png"}],
+		)
+		for n in range(1, 5)
+	]
+	second_started = threading.Event()
+	overlapped = []
+
+	def download(url, config, progress_label=None):
+		name = url.rsplit("/", 1)[-1]
+		if name == "2.png":
+			second_started.set()
+		tmpfile = tmp_path / f"{name}.tmp"
+		tmpfile.write_bytes(name.encode())
+		return str(tmpfile), name, 1
+
+	class PipelineDB(DummyDB):
+		def set(self, record):
+			if record["sha256"] == "1.png":
+				overlapped.append(second_started.wait(timeout=5))
+			super().set(record)
+
+	deleted = []
+	closed = []
+	api = types.SimpleNamespace(
+		fetch_bookmarks=lambda: iter(statuses),
+		delete_bookmarks=lambda ids: deleted.extend(ids) or {},
+		close=lambda: closed.append(list(deleted)),
+	)
+	db = PipelineDB()
+	patch_fetch(download_and_sha256=download)
+
+	run_instance(inst, api, db, cfg)
+
+	assert overlapped == [True]
+	assert [record["sha256"] for record in db.set_calls] == ["1.png", "2.png", "3.png"]
+	# The status that reaches the limit is not unbookmarked, as in serial mode.
+	assert deleted == ["1", "2"]
+	# Closed once, after the final unbookmarks were sent.
+	assert closed == [["1", "2"]]
+
+
+def test_run_instance_unbookmarks_in_batches(cfg, inst, patch_fetch, tmp_path, capsys):
+	cfg.download.rate.delay_seconds = 0
+	cfg.runtime.unbookmark = True
+	statuses = [
+		make_status(
+			id=str(n),
+			media_attachments=[{"type": "image", "remote_url": f"https://cdn.example/media/{n}.png"}],
+		)
+		for n in range(1, 6)
+	]
+
+	def download(url, config, progress_label=None):
+		name = url.rsplit("/", 1)[-1]
+		tmpfile = tmp_path / f"{name}.tmp"
+		tmpfile.write_bytes(name.encode())
+		return str(tmpfile), name, 1
+
+	batches = []
+
+	def delete_bookmarks(ids):
+		batches.append(list(ids))
+		return {"4": RuntimeError("boom")} if "4" in ids else {}
+
+	api = types.SimpleNamespace(
+		fetch_bookmarks=lambda: iter(statuses),
+		delete_bookmarks=delete_bookmarks,
+		close=lambda: None,
+	)
+	patch_fetch(download_and_sha256=download, _UNBOOKMARK_BATCH=2)
+
+	run_instance(inst, api, DummyDB(), cfg)
+
+	assert batches == [["1", "2"], ["3", "4"], ["5"]]
+	assert "unbookmark failed for 4: boom" in capsys.readouterr().out
+
+
+def test_log_removed_records_entry_when_not_dry_run(inst, status_template):
+	cfg = GlobalConfig()
 	db = DummyDB()
 
 	log_removed(
 		db,
-		status,
+		status_template,
 		inst,
 		sha256="deadbeef",
 		reason="duplicate",
@@ -435,47 +551,60 @@ def test_log_removed_records_entry_when_not_dry_run():
 	assert entry["origin_group"] == "example"
 
 
-def test_removed_media_tracker_skips_recent_entries(tmp_path):
-	removed_path = tmp_path / "removed.jsonl"
+@pytest.mark.filesystem
+def test_removed_media_tracker_skips_recent_entries(make_tracker):
 	entry = {
 		"time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
 		"reason": "media_not_found",
 		"media_urls": ["https://cdn.example/media/file.png"],
 	}
-	removed_path.write_text(json.dumps(entry) + "\n", encoding="utf-8")
 
-	tracker = RemovedMediaTracker(removed_path, 3600)
+	tracker = make_tracker([entry], 3600)
 	assert tracker.should_skip("https://cdn.example/media/file.png") is True
 	assert tracker.should_skip("https://cdn.example/media/other.png") is False
 
 
-def test_removed_media_tracker_ignores_old_entries(tmp_path):
-	removed_path = tmp_path / "removed.jsonl"
+@pytest.mark.filesystem
+def test_removed_media_tracker_ignores_old_entries(make_tracker):
 	entry = {
 		"time": "2010-01-01T00:00:00+00:00",
 		"reason": "media_not_found",
 		"media_urls": ["https://cdn.example/media/file.png"],
 	}
-	removed_path.write_text(json.dumps(entry) + "\n", encoding="utf-8")
 
-	tracker = RemovedMediaTracker(removed_path, 60)
+	tracker = make_tracker([entry], 60)
 	assert tracker.should_skip("https://cdn.example/media/file.png") is False
 
 
-def test_log_removed_skips_when_dry_run():
+def test_log_removed_uses_precomputed_media_urls(inst, status_template):
 	cfg = GlobalConfig()
-	cfg.runtime.dry_run = True
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
+	db = DummyDB()
+
+	log_removed(
+		db,
+		status_template,
+		inst,
+		sha256=None,
+		reason="filtered",
+		origin_host=None,
+		origin_group=None,
+		account_host=None,
+		account_group=None,
+		config=cfg,
+		media_urls=["https://cdn.example/given.png"],
 	)
-	status = make_status()
+
+	assert db.logged[0]["media_urls"] == ["https://cdn.example/given.png"]
+
+
+def test_log_removed_skips_when_dry_run(inst, status_template):
+	cfg = GlobalConfig()
+	cfg.runtime.dry_run = True
 	db = DummyDB()
 
 	log_removed(
 		db,
-		status,
+		status_template,
 		inst,
 		sha256="deadbeef",
 		reason="duplicate",
@@ -489,18 +618,12 @@ def test_log_removed_skips_when_dry_run():
 	assert db.logged == []
 
 
-def test_log_download_appends_jsonl(tmp_path, monkeypatch):
-	cfg = _make_config(tmp_path)
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
+@pytest.mark.filesystem
+def test_log_download_appends_jsonl(cfg, inst, status_template, tmp_path):
 	cfg.paths.logs = tmp_path / "logs"
-	status = make_status()
 
 	log_download(
-		status,
+		status_template,
 		inst,
 		filepath=cfg.paths.download / "example.png",
 		sha256="abc123",
@@ -512,29 +635,32 @@ def test_log_download_appends_jsonl(tmp_path, monkeypatch):
 		account_group="example",
 	)
 
-	log_path = build_log_path(status, inst, cfg)
+	flush_logs()
+	log_path = build_log_path(
+		status_template,
+		inst,
+		cfg,
+		origin_host="cdn.example",
+		origin_group="example",
+		account_host="example.social",
+		account_group="example",
+	)
+	assert log_path.parent == cfg.paths.logs / "example"
 	assert log_path.exists()
 	lines = log_path.read_text(encoding="utf-8").splitlines()
 	assert len(lines) == 1
-	import json
 	entry = json.loads(lines[0])
 	assert entry["sha256"] == "abc123"
 	assert entry["instance_label"] == "inst"
 
 
-def test_log_download_skips_when_dry_run(tmp_path):
-	cfg = _make_config(tmp_path)
+@pytest.mark.filesystem
+def test_log_download_skips_when_dry_run(cfg, inst, status_template, tmp_path):
 	cfg.runtime.dry_run = True
-	inst = InstanceConfig(
-		name="inst",
-		base_url="https://example",
-		access_token="token",
-	)
-	status = make_status()
 	cfg.paths.logs = tmp_path / "logs"
 
 	log_download(
-		status,
+		status_template,
 		inst,
 		filepath=cfg.paths.download / "example.png",
 		sha256="abc123",
@@ -547,3 +673,75 @@ def test_log_download_skips_when_dry_run(tmp_path):
 	)
 
 	assert not any(cfg.paths.logs.rglob("*.jsonl"))
+
+
+@pytest.mark.filesystem
+def test_removed_media_tracker_dry_run_does_not_write_sidecar(tmp_path):
+	removed_path = tmp_path / "removed.jsonl"
+	now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+	record = {"time": now, "reason": "media_not_found", "media_urls": ["https://cdn.example/a.png"]}
+	removed_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+	tracker = RemovedMediaTracker(removed_path, 3600, dry_run=True)
+
+	assert tracker.should_skip("https://cdn.example/a.png") is True
+	assert sorted(p.name for p in tmp_path.iterdir()) == ["removed.jsonl"]
+
+
+@pytest.mark.filesystem
+def test_removed_media_tracker_reads_only_new_log_records(tmp_path):
+	removed_path = tmp_path / "removed.jsonl"
+	now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+	def entry(url):
+		return json.dumps({"time": now, "reason": "media_not_found", "media_urls": [url]}) + "\n"
+
+	removed_path.write_text(entry("https://cdn.example/a.png"), encoding="utf-8")
+	RemovedMediaTracker(removed_path, 3600)
+	sidecar = tmp_path / "removed.recent.json"
+	assert json.loads(sidecar.read_text(encoding="utf-8"))["offset"] == removed_path.stat().st_size
+
+	# Corrupt the already-covered record: a full rescan would drop it.
+	covered = removed_path.stat().st_size
+	with removed_path.open("r+b") as f:
+		f.write(b"#" * (covered - 1))
+	with removed_path.open("a", encoding="utf-8") as f:
+		f.write(entry("https://cdn.example/b.png"))
+		f.write('{"partial": ')
+
+	tracker = RemovedMediaTracker(removed_path, 3600)
+	assert tracker.should_skip("https://cdn.example/a.png") is True
+	assert tracker.should_skip("https://cdn.example/b.png") is True
+	assert json.loads(sidecar.read_text(encoding="utf-8"))["offset"] == removed_path.stat().st_size - len('{"partial": ')
+
+
+@pytest.mark.filesystem
+def test_removed_media_tracker_rescans_when_log_shrinks(tmp_path):
+	removed_path = tmp_path / "removed.jsonl"
+	now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+	record = {"time": now, "reason": "media_not_found", "media_urls": ["https://cdn.example/a.png"]}
+	removed_path.write_text((json.dumps(record) + "\n") * 3, encoding="utf-8")
+	assert RemovedMediaTracker(removed_path, 3600).should_skip("https://cdn.example/a.png") is True
+
+	record["media_urls"] = ["https://cdn.example/b.png"]
+	removed_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+	tracker = RemovedMediaTracker(removed_path, 3600)
+	assert tracker.should_skip("https://cdn.example/a.png") is False
+	assert tracker.should_skip("https://cdn.example/b.png") is True
+
+
+@pytest.mark.filesystem
+def test_removed_media_tracker_parses_z_and_naive_timestamps(make_tracker):
+	now = datetime.datetime.now(datetime.timezone.utc)
+	lines = [
+		{"time": now.strftime("%Y-%m-%dT%H:%M:%SZ"), "reason": "media_not_found", "media_urls": ["https://cdn.example/z.png"]},
+		{"time": now.replace(tzinfo=None).isoformat(), "reason": "media_not_found", "media_urls": ["https://cdn.example/naive.png"]},
+		{"time": "not a time", "reason": "media_not_found", "media_urls": ["https://cdn.example/bad.png"]},
+	]
+
+	tracker = make_tracker(lines, 3600)
+
+	assert tracker.should_skip("https://cdn.example/z.png") is True
+	assert tracker.should_skip("https://cdn.example/naive.png") is True
+	assert tracker.should_skip("https://cdn.example/bad.png") is False
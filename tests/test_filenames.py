@@ -1,5 +1,7 @@
 from datetime import datetime
 
+import pytest
+
 from config import GlobalConfig
 from filenames import (
 	build_filepath,
@@ -8,6 +10,7 @@ from filenames import (
 	_date_vars,
 	_default_log_pattern,
 	build_tmp_path,
+	PathBuilder,
 )
 from helpers import make_status
 
@@ -52,6 +55,25 @@ def test_format_template_handles_prefix_and_missing_keys():
 	assert result == "alice-abcd-{missing}"
 
 
+@pytest.mark.parametrize(
+	("template", "expected"),
+	[
+		("{index:2}-{index}", "{index:2}-7"),
+		("{sha256:0}{sha256:65}{sha256:08}", "{sha256:0}{sha256:65}{sha256:08}"),
+		("{sha256:64}", "abcdef"),
+		("{{sha256:2}}", "{ab}"),
+	],
+)
+def test_format_template_width_edge_cases(template, expected):
+	assert format_template(template, {"index": 7, "sha256": "abcdef"}) == expected
+
+
+def test_format_template_compiles_literals_verbatim():
+	template = "it's \\ \"{name}\"\n{name:3}"
+	assert format_template(template, {"name": "gataku"}) == "it's \\ \"gataku\"\ngat"
+	assert format_template("", {"name": "gataku"}) == ""
+
+
 def test_date_vars_generate_consistent_components():
 	created = datetime(2023, 3, 15, 10, 20, 30)
 	vars = _date_vars(created)
@@ -67,13 +89,35 @@ def test_date_vars_generate_consistent_components():
 	assert vars["yearhalf"] == "2023H1"
 
 
-def test_default_log_pattern_variants():
-	assert _default_log_pattern("day") == "{origin_group}/{yearmonth}/{date}.jsonl"
-	assert _default_log_pattern("week") == "{origin_group}/{yearweek}.jsonl"
-	assert _default_log_pattern("quarter") == "{origin_group}/{yearquarter}.jsonl"
-	assert _default_log_pattern("half") == "{origin_group}/{yearhalf}.jsonl"
-	assert _default_log_pattern("year") == "{origin_group}/{year}.jsonl"
-	assert _default_log_pattern("unknown") == "{origin_group}/{yearmonth}.jsonl"
+def test_date_vars_share_day_components_but_not_time():
+	first = _date_vars(datetime(2024, 12, 30, 1, 2, 3))
+	second = _date_vars(datetime(2024, 12, 30, 23, 59, 58))
+
+	assert first["datetime"] == "20241230010203"
+	assert second["datetime"] == "20241230235958"
+	assert {k: v for k, v in first.items() if k != "datetime"} == {
+		k: v for k, v in second.items() if k != "datetime"
+	}
+	# ISO week 1 of 2025, paired with the calendar year as before.
+	assert first["yearweek"] == "2024W01"
+
+	first["year"] = "mutated"
+	assert _date_vars(datetime(2024, 12, 30))["year"] == "2024"
+
+
+@pytest.mark.parametrize(
+	"freq,expected",
+	[
+		("day", "{origin_group}/{yearmonth}/{date}.jsonl"),
+		("week", "{origin_group}/{yearweek}.jsonl"),
+		("quarter", "{origin_group}/{yearquarter}.jsonl"),
+		("half", "{origin_group}/{yearhalf}.jsonl"),
+		("year", "{origin_group}/{year}.jsonl"),
+		("unknown", "{origin_group}/{yearmonth}.jsonl"),
+	],
+)
+def test_default_log_pattern(freq, expected):
+	assert _default_log_pattern(freq) == expected
 
 
 def test_build_log_path_supports_half_frequency(tmp_path):
@@ -93,3 +137,43 @@ def test_build_tmp_path_uses_sha_prefix(tmp_path):
 	cfg.paths.tmp = tmp_path
 	path = build_tmp_path("abcdef1234567890fedcba", cfg)
 	assert path == tmp_path / "abcdef1234567890.tmp"
+
+
+def test_path_builder_resolves_patterns_once(tmp_path):
+	cfg = GlobalConfig()
+	cfg.paths.download = tmp_path / "downloads"
+	cfg.paths.logs = tmp_path / "logs"
+	cfg.download.filename_pattern = "{account_group}/{sha256:4}.{ext}"
+	cfg.logging.frequency = "year"
+	builder = PathBuilder(cfg)
+
+	# Later config edits do not affect an already built instance.
+	cfg.download.filename_pattern = "{sha256}"
+	cfg.logging.frequency = "day"
+
+	assert builder.render_file({"account_group": "masto", "sha256": "abcdef", "ext": "png"}) == (
+		tmp_path / "downloads" / "masto" / "abcd.png"
+	)
+	assert builder.render_log({"origin_group": "other", "year": "2024"}) == (
+		tmp_path / "logs" / "other" / "2024.jsonl"
+	)
+
+
+def test_build_log_path_uses_given_classification(tmp_path, monkeypatch):
+	cfg = GlobalConfig()
+	cfg.paths.logs = tmp_path / "logs"
+	cfg.logging.filename_pattern = "{origin_group}-{account_group}.jsonl"
+	monkeypatch.setattr("filenames.classify_origin_host", lambda url: pytest.fail("reclassified"))
+	monkeypatch.setattr("filenames.classify_account_host", lambda status: pytest.fail("reclassified"))
+
+	path = build_log_path(
+		make_status(),
+		None,
+		cfg,
+		origin_host="cdn.example",
+		origin_group="pawoo",
+		account_host="example.social",
+		account_group="mastodon",
+	)
+
+	assert path == tmp_path / "logs" / "pawoo-mastodon.jsonl"
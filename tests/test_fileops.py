@@ -1,7 +1,10 @@
+import pytest
+
 from config import GlobalConfig, PathConfig, ArchivePolicyConfig
 from fileops import move_to_archive
 
 
+@pytest.mark.filesystem
 def test_move_to_archive_deletes_when_disabled(tmp_path):
 	download = tmp_path / "download"
 	download.mkdir()
@@ -17,6 +20,7 @@ def test_move_to_archive_deletes_when_disabled(tmp_path):
 	assert not file_path.exists()
 
 
+@pytest.mark.filesystem
 def test_move_to_archive_moves_into_archive(tmp_path):
 	download = tmp_path / "dl"
 	archive = tmp_path / "arch"
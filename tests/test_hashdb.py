@@ -1,39 +1,123 @@
 import json
 
+import pytest
+
 from hashdb import JsonlHashDB
 
 
-def test_delete_by_filepaths_rewrites_db(tmp_path, monkeypatch):
+@pytest.fixture
+def populated_db(tmp_path):
+	"""A db holding one relative and one absolute filepath under out/downloads."""
 	db_path = tmp_path / "hashdb.jsonl"
 	removed_path = tmp_path / "removed.jsonl"
 	download_root = tmp_path / "out" / "downloads"
-	download_root.mkdir(parents=True, exist_ok=True)
+	download_root.mkdir(parents=True)
 
-	entry1 = {
-		"sha256": "aaa",
-		"filepath": "out/downloads/foo.png",
-	}
-	entry2 = {
-		"sha256": "bbb",
-		"filepath": str(download_root / "bar.png"),
-	}
+	entries = [
+		{"sha256": "aaa", "filepath": "out/downloads/foo.png"},
+		{"sha256": "bbb", "filepath": str(download_root / "bar.png")},
+	]
+	db_path.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
 
-	with db_path.open("w", encoding="utf-8") as f:
-		f.write(json.dumps(entry1) + "\n")
-		f.write(json.dumps(entry2) + "\n")
+	return JsonlHashDB(db_path, removed_path), entries, download_root
 
-	db = JsonlHashDB(db_path, removed_path)
+
+def test_delete_by_filepaths_rewrites_db(populated_db, tmp_path, monkeypatch):
+	db, entries, download_root = populated_db
 
 	monkeypatch.chdir(tmp_path)
 
 	target = download_root / "foo.png"
 	removed = db.delete_by_filepaths([target])
 
-	assert len(removed) == 1
+	assert list(removed) == [entries[0]]
 	assert db.get("aaa") is None
 	assert db.get("bbb") is not None
 
-	with db_path.open("r", encoding="utf-8") as f:
+	with db.path.open("r", encoding="utf-8") as f:
 		lines = [line for line in f.read().splitlines() if line]
 	assert len(lines) == 1
 	assert json.loads(lines[0])["sha256"] == "bbb"
+
+
+def test_set_and_log_removed_are_buffered_until_flush(tmp_path):
+	db_path = tmp_path / "db" / "hashdb.jsonl"
+	removed_path = tmp_path / "db" / "removed.jsonl"
+	db = JsonlHashDB(db_path, removed_path)
+
+	db.set({"sha256": "aaa", "filepath": "a.png"})
+	db.log_removed({"sha256": "bbb", "reason": "duplicate"})
+	db.flush()
+
+	assert json.loads(db_path.read_text(encoding="utf-8"))["sha256"] == "aaa"
+	assert json.loads(removed_path.read_text(encoding="utf-8"))["reason"] == "duplicate"
+
+	db.set({"sha256": "ccc", "filepath": "c.png"})
+	db.close()
+
+	reloaded = JsonlHashDB(db_path, removed_path)
+	assert reloaded.get("aaa") is not None
+	assert reloaded.get("ccc") is not None
+
+
+def test_delete_by_filepaths_after_buffered_set(tmp_path):
+	db_path = tmp_path / "hashdb.jsonl"
+	db = JsonlHashDB(db_path, tmp_path / "removed.jsonl")
+
+	db.set({"sha256": "aaa", "filepath": str(tmp_path / "a.png")})
+	db.set({"sha256": "bbb", "filepath": str(tmp_path / "b.png")})
+	db.delete_by_filepaths([tmp_path / "a.png"])
+	db.set({"sha256": "ccc", "filepath": str(tmp_path / "c.png")})
+	db.close()
+
+	lines = db_path.read_text(encoding="utf-8").splitlines()
+	assert [json.loads(line)["sha256"] for line in lines] == ["bbb", "ccc"]
+
+
+def test_load_skips_blank_and_malformed_lines(tmp_path):
+	db_path = tmp_path / "hashdb.jsonl"
+	db_path.write_bytes(
+		b'{"sha256": "aaa", "filepath": "a.png"}\r\n'
+		b"\n"
+		b"   \n"
+		b"{broken\n"
+		b'["not", "an", "object"]\n'
+		b'  {"sha256": "bbb", "filepath": "b.png"}'
+	)
+
+	db = JsonlHashDB(db_path, tmp_path / "removed.jsonl")
+
+	assert set(db.entries) == {"aaa", "bbb"}
+
+
+def test_delete_by_filepaths_matches_through_symlinked_dirs(tmp_path):
+	real_dir = tmp_path / "real"
+	real_dir.mkdir()
+	link_dir = tmp_path / "link"
+	link_dir.symlink_to(real_dir, target_is_directory=True)
+	db_path = tmp_path / "hashdb.jsonl"
+	db = JsonlHashDB(db_path, tmp_path / "removed.jsonl")
+	db.set({"sha256": "aaa", "filepath": str(link_dir / "a.png")})
+	db.set({"sha256": "bbb", "filepath": str(link_dir / "b.png")})
+
+	removed = db.delete_by_filepaths([real_dir / "a.png"])
+
+	assert [entry["sha256"] for entry in removed] == ["aaa"]
+	assert list(db.entries) == ["bbb"]
+	assert not (tmp_path / "hashdb.jsonl.tmp").exists()
+	assert [json.loads(line)["sha256"] for line in db_path.read_text(encoding="utf-8").splitlines()] == ["bbb"]
+
+
+def test_delete_by_filepaths_matches_symlinked_file(tmp_path):
+	target = tmp_path / "real.png"
+	target.write_bytes(b"png")
+	link = tmp_path / "link.png"
+	link.symlink_to(target)
+	db = JsonlHashDB(tmp_path / "hashdb.jsonl", tmp_path / "removed.jsonl")
+	db.set({"sha256": "aaa", "filepath": str(link)})
+	db.set({"sha256": "bbb", "filepath": str(tmp_path / "other.png")})
+
+	removed = db.delete_by_filepaths([target])
+
+	assert [entry["sha256"] for entry in removed] == ["aaa"]
+	assert list(db.entries) == ["bbb"]
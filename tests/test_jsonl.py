@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import jsonl
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_line_roundtrip(monkeypatch, use_orjson):
+	if use_orjson:
+		pytest.importorskip("orjson")
+	else:
+		monkeypatch.setattr(jsonl, "orjson", None)
+
+	record = {"sha256": "abc", "filepath": "写真/猫.jpg", "size": 3}
+	line = jsonl.dumps_line(record)
+
+	assert line.endswith(b"\n")
+	assert "猫".encode("utf-8") in line
+	assert jsonl.loads(line) == record
+	assert json.loads(line.decode("utf-8")) == record
+
+
+def test_stdlib_fallback_matches_orjson_bytes(monkeypatch):
+	orjson = pytest.importorskip("orjson")
+	record = {
+		"ts": "2024-01-01T00:00:00+00:00",
+		"filepath": "写真/猫 \"quoted\"\\.jpg",
+		"media": [{"id": 1, "size": 1024, "ratio": 0.5}, None],
+		"deleted": True,
+		"dry_run": False,
+		"note": "tab\tnewline\n",
+	}
+	expected = orjson.dumps(record)
+
+	monkeypatch.setattr(jsonl, "orjson", None)
+	assert jsonl.dumps(record) == expected
+	assert jsonl.dumps_line(record) == expected + b"\n"
+
+
+def test_stdlib_fallback_rejects_nan(monkeypatch):
+	monkeypatch.setattr(jsonl, "orjson", None)
+	with pytest.raises(ValueError):
+		jsonl.dumps_line({"ratio": float("nan")})
+
+
+def test_loads_raises_json_decode_error():
+	with pytest.raises(jsonl.JSONDecodeError):
+		jsonl.loads(b"{broken")
+
+
+def test_async_writer_writes_in_order_on_flush(tmp_path):
+	path = tmp_path / "logs" / "out.jsonl"
+	writer = jsonl.AsyncJsonlWriter(batch_size=4)
+
+	for n in range(10):
+		writer.append(path, {"n": n})
+	writer.flush()
+
+	assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == list(range(10))
+	writer.close()
+
+
+def test_async_writer_close_path_then_append_reopens(tmp_path):
+	path = tmp_path / "out.jsonl"
+	writer = jsonl.AsyncJsonlWriter()
+
+	writer.append(path, {"n": 1})
+	writer.close(path)
+	path.write_bytes(b"")
+	writer.append(path, {"n": 2})
+	writer.close()
+
+	assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == [2]
+
+
+def test_async_writer_reports_write_errors(tmp_path):
+	blocker = tmp_path / "blocker"
+	blocker.write_text("not a directory")
+	writer = jsonl.AsyncJsonlWriter()
+
+	writer.append(blocker / "out.jsonl", {"n": 1})
+	with pytest.raises(OSError):
+		writer.flush()
+
+	writer.close()
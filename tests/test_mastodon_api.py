@@ -1,5 +1,33 @@
+import json
+import threading
+
+import pytest
+
 from config import InstanceConfig
-from mastodon_api import MastodonAPI
+from mastodon_api import USER_AGENT, MastodonAPI
+
+
+class DummyResponse:
+	def __init__(self, content, links=None):
+		self.status_code = 200
+		self.content = content
+		self.links = links or {}
+
+	def raise_for_status(self):
+		pass
+
+
+@pytest.fixture(scope="module")
+def api():
+	# Tests only patch attributes through monkeypatch, so one client is shared.
+	with MastodonAPI(
+		InstanceConfig(
+			name="test",
+			base_url="https://example",
+			access_token="token",
+		)
+	) as client:
+		yield client
 
 
 def test_parse_next_max_id_extracts_query_param():
@@ -17,14 +45,17 @@ def test_parse_next_max_id_returns_none_when_missing():
 	assert MastodonAPI._parse_next_max_id({"next": {"url": "https://example"}}) is None
 
 
-def test_fetch_bookmarks_iterates_pages(monkeypatch):
-	inst = InstanceConfig(
-		name="test",
-		base_url="https://example",
-		access_token="token",
-	)
-	api = MastodonAPI(inst)
+def test_parse_next_max_id_matches_whole_parameter_name():
+	def parse(url):
+		return MastodonAPI._parse_next_max_id({"next": {"url": url}})
 
+	assert parse("https://example/api/v1/bookmarks?limit=40&max_id=99") == "99"
+	assert parse("https://example/api/v1/bookmarks?xmax_id=1&max_id=2#frag") == "2"
+	assert parse("https://example/api/v1/bookmarks?xmax_id=1") is None
+	assert parse("https://example/api/v1/bookmarks?max_id=&limit=40") is None
+
+
+def test_fetch_bookmarks_iterates_pages(api, monkeypatch):
 	pages = [
 		([{"id": "1"}], "m1"),
 		([{"id": "2"}], None),
@@ -45,38 +76,70 @@ def test_fetch_bookmarks_iterates_pages(monkeypatch):
 	assert calls == [None, "m1"]
 
 
-def test_fetch_bookmarks_page_parses_links(monkeypatch):
-	inst = InstanceConfig(
-		name="test",
-		base_url="https://example",
-		access_token="token",
-	)
-	api = MastodonAPI(inst)
+def test_fetch_bookmarks_prefetches_next_page(api, monkeypatch):
+	pages = {
+		None: ([{"id": "1"}, {"id": "2"}], "m1"),
+		"m1": ([{"id": "3"}], "m2"),
+		"m2": ([], None),
+	}
+	requested = {key: threading.Event() for key in pages}
 
-	captured = {}
+	def fake_fetch(self, max_id=None, limit=40):
+		requested[max_id].set()
+		return pages[max_id]
+
+	monkeypatch.setattr(MastodonAPI, "_fetch_bookmarks_page", fake_fetch, raising=False)
+
+	bookmarks = api.fetch_bookmarks()
+	assert next(bookmarks)["id"] == "1"
+	# page two is requested while the caller is still on page one
+	assert requested["m1"].wait(timeout=5)
+	assert [status["id"] for status in bookmarks] == ["2", "3"]
+	assert requested["m2"].is_set()
+
+
+def test_fetch_bookmarks_can_stop_early(api, monkeypatch):
+	requested = []
+	prefetching = threading.Event()
+	release = threading.Event()
+
+	def fake_fetch(self, max_id=None, limit=40):
+		requested.append(max_id)
+		if max_id is not None:
+			prefetching.set()
+			release.wait(timeout=5)
+		return [{"id": max_id or "first"}], f"{max_id or ''}x"
+
+	monkeypatch.setattr(MastodonAPI, "_fetch_bookmarks_page", fake_fetch, raising=False)
+
+	bookmarks = api.fetch_bookmarks()
+	assert next(bookmarks)["id"] == "first"
+	assert prefetching.wait(timeout=5)
+	bookmarks.close()
+	release.set()
 
-	class DummyResponse:
-		def __init__(self):
-			self.status_code = 200
-			self.links = {
-				"next": {
-					"url": "https://example/api/v1/bookmarks?max_id=next123",
-				}
-			}
+	# the in-flight prefetch finishes, then the worker exits without
+	# requesting the page after it
+	workers = [t for t in threading.enumerate() if t.name.startswith("bookmarks")]
+	assert workers
+	for worker in workers:
+		worker.join(timeout=5)
+	assert not any(worker.is_alive() for worker in workers)
+	assert requested == [None, "x"]
 
-		def raise_for_status(self):
-			pass
 
-		def json(self):
-			return [{"id": "a"}]
+def test_fetch_bookmarks_page_parses_links(api, monkeypatch):
+	captured = {}
 
-	def fake_get(url, headers, params, timeout):
+	def fake_get(url, params, timeout):
 		captured["url"] = url
-		captured["headers"] = headers
 		captured["params"] = params
-		return DummyResponse()
+		return DummyResponse(
+			b'[{"id": "a"}]',
+			links={"next": {"url": "https://example/api/v1/bookmarks?max_id=next123"}},
+		)
 
-	monkeypatch.setattr("mastodon_api.requests.get", fake_get)
+	monkeypatch.setattr(api._session, "get", fake_get)
 
 	data, next_id = api._fetch_bookmarks_page(max_id="prev", limit=2)
 
@@ -84,4 +147,78 @@ def test_fetch_bookmarks_page_parses_links(monkeypatch):
 	assert next_id == "next123"
 	assert captured["params"]["max_id"] == "prev"
 	assert captured["params"]["limit"] == 2
-	assert "Authorization" in captured["headers"]
+	assert captured["url"] == "https://example/api/v1/bookmarks"
+
+
+def test_fetch_bookmarks_dumps_raw_pages_from_caller_thread(api, monkeypatch, capsysbinary):
+	monkeypatch.setattr(api, "dump_raw", True)
+	pages = {
+		None: ([{"id": "a", "content": "猫"}], "m1"),
+		"m1": ([{"id": "b"}], None),
+	}
+	monkeypatch.setattr(MastodonAPI, "_fetch_bookmarks_page", lambda self, max_id=None, limit=40: pages[max_id])
+
+	dump_threads = []
+	real_dump = MastodonAPI._dump_page
+
+	def recording_dump(data):
+		dump_threads.append(threading.get_ident())
+		real_dump(data)
+
+	monkeypatch.setattr(MastodonAPI, "_dump_page", staticmethod(recording_dump))
+
+	assert [status["id"] for status in api.fetch_bookmarks()] == ["a", "b"]
+
+	# the prefetch thread never writes to stdout
+	assert dump_threads == [threading.get_ident()] * 2
+	lines = capsysbinary.readouterr().out.splitlines()
+	assert [json.loads(line) for line in lines] == [pages[None][0], pages["m1"][0]]
+
+
+def test_api_session_carries_auth_headers_and_retries():
+	inst = InstanceConfig(
+		name="test",
+		base_url="https://example/",
+		access_token="token",
+	)
+	api = MastodonAPI(inst)
+
+	assert api._session.headers["Authorization"] == "Bearer token"
+	assert api._session.headers["User-Agent"] == USER_AGENT
+	assert api._auth_headers() is api._auth_headers()
+
+	adapter = api._session.get_adapter("https://example/api/v1/bookmarks")
+	assert adapter.max_retries.total == 3
+	assert 429 in adapter.max_retries.status_forcelist
+	assert "POST" in adapter.max_retries.allowed_methods
+
+
+def test_close_closes_session(monkeypatch):
+	api = MastodonAPI(InstanceConfig(name="test", base_url="https://example", access_token="token"))
+	closed = []
+	monkeypatch.setattr(api._session, "close", lambda: closed.append(True))
+
+	with api as entered:
+		assert entered is api
+
+	assert closed == [True]
+
+
+def test_delete_bookmarks_attempts_all_and_reports_failures(api, monkeypatch):
+	deleted = []
+	lock = threading.Lock()
+
+	def fake_delete(self, status_id):
+		if status_id == "bad":
+			raise RuntimeError("boom")
+		with lock:
+			deleted.append(status_id)
+
+	monkeypatch.setattr(MastodonAPI, "delete_bookmark", fake_delete)
+
+	failures = api.delete_bookmarks(["1", "bad", "2", "3"])
+
+	assert sorted(deleted) == ["1", "2", "3"]
+	assert list(failures) == ["bad"]
+	assert str(failures["bad"]) == "boom"
+	assert api.delete_bookmarks([]) == {}
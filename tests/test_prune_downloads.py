@@ -0,0 +1,67 @@
+import json
+import sys
+
+import pytest
+
+from prune_downloads import _normalize_target, main
+
+
+def test_normalize_target_resolves_relative_and_absolute(tmp_path):
+	root = tmp_path.resolve()
+
+	assert _normalize_target(root, "misskey/a.png") == root / "misskey" / "a.png"
+	assert _normalize_target(root, str(root / "b.png")) == root / "b.png"
+	assert _normalize_target(root, "x/../c.png") == root / "c.png"
+
+
+@pytest.mark.parametrize("spec", [".", "..", "../outside.png", "/elsewhere/file.png"])
+def test_normalize_target_rejects_root_and_escapes(tmp_path, spec):
+	with pytest.raises(ValueError):
+		_normalize_target(tmp_path.resolve(), spec)
+
+
+def test_main_deduplicates_targets(tmp_path, monkeypatch, capsys):
+	download = tmp_path / "download"
+	(download / "group").mkdir(parents=True)
+	target = download / "group" / "a.png"
+	target.write_bytes(b"a")
+	hashdb_file = tmp_path / "hashdb.jsonl"
+	hashdb_file.write_text(json.dumps({"sha256": "aaa", "filepath": str(target)}) + "\n")
+	config = tmp_path / "config.yaml"
+	config.write_text(
+		"paths:\n"
+		f"  download: \"{download}\"\n"
+		f"  hashdb_file: \"{hashdb_file}\"\n"
+		f"  removed_log_file: \"{tmp_path / 'removed.jsonl'}\"\n"
+	)
+	monkeypatch.setattr(sys, "argv", ["prune_downloads", "--config", str(config), "group/a.png", str(target)])
+
+	assert main() == 0
+
+	out = capsys.readouterr().out
+	assert not target.exists()
+	assert "Removed 1 entries" in out
+	assert "Files deleted: 1, missing: 0" in out
+
+
+def test_main_reports_missing_files_in_order(tmp_path, monkeypatch, capsys):
+	download = tmp_path / "download"
+	download.mkdir()
+	present = download / "b.png"
+	present.write_bytes(b"b")
+	config = tmp_path / "config.yaml"
+	config.write_text(
+		"paths:\n"
+		f"  download: \"{download}\"\n"
+		f"  hashdb_file: \"{tmp_path / 'hashdb.jsonl'}\"\n"
+		f"  removed_log_file: \"{tmp_path / 'removed.jsonl'}\"\n"
+	)
+	monkeypatch.setattr(sys, "argv", ["prune_downloads", "--config", str(config), "a.png", "b.png"])
+
+	assert main() == 0
+
+	lines = capsys.readouterr().out.splitlines()
+	assert not present.exists()
+	assert lines[-3].startswith("[WARN] File not found") and lines[-3].endswith("a.png")
+	assert lines[-2].startswith("[OK] Deleted file") and lines[-2].endswith("b.png")
+	assert lines[-1] == "[DONE] Files deleted: 1, missing: 1"
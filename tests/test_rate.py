@@ -0,0 +1,59 @@
+from rate import RateLimiter
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 100.0
+		self.sleeps = []
+
+	def monotonic(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.sleeps.append(seconds)
+		self.now += seconds
+
+
+def _install(monkeypatch):
+	clock = FakeClock()
+	monkeypatch.setattr("rate.time.monotonic", clock.monotonic)
+	monkeypatch.setattr("rate.time.sleep", clock.sleep)
+	return clock
+
+
+def test_rate_limiter_counts_elapsed_time_toward_delay(monkeypatch):
+	clock = _install(monkeypatch)
+	limiter = RateLimiter(30)
+
+	limiter.wait()
+	assert clock.sleeps == []
+
+	clock.now += 10  # e.g. a download
+	limiter.wait()
+	assert clock.sleeps == [20]
+
+	clock.now += 45  # slower than the delay: no sleep
+	limiter.wait()
+	assert clock.sleeps == [20]
+
+
+def test_rate_limiter_does_not_accumulate_credit(monkeypatch):
+	clock = _install(monkeypatch)
+	limiter = RateLimiter(10)
+
+	limiter.wait()
+	clock.now += 100
+	limiter.wait()
+	limiter.wait()
+
+	assert clock.sleeps == [10]
+
+
+def test_rate_limiter_zero_delay_never_sleeps(monkeypatch):
+	clock = _install(monkeypatch)
+	limiter = RateLimiter(0)
+
+	for _ in range(3):
+		limiter.wait()
+
+	assert clock.sleeps == []
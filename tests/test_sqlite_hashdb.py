@@ -0,0 +1,75 @@
+import json
+
+from config import GlobalConfig
+from hashdb import JsonlHashDB, open_hashdb
+from sqlite_hashdb import SqliteHashDB
+
+
+def test_set_get_and_reopen(tmp_path):
+	db_path = tmp_path / "db" / "hashdb.sqlite3"
+	db = SqliteHashDB(db_path, tmp_path / "removed.jsonl")
+
+	db.set({"sha256": "aaa", "filepath": "a.png", "caption": "猫"})
+	assert db.get("aaa")["caption"] == "猫"
+	assert db.get("missing") is None
+
+	db.set({"sha256": "aaa", "filepath": "b.png"})
+	db.close()
+
+	reopened = SqliteHashDB(db_path, tmp_path / "removed.jsonl")
+	assert reopened.get("aaa") == {"sha256": "aaa", "filepath": "b.png"}
+	reopened.close()
+
+
+def test_delete_by_filepaths_removes_matching_rows(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	download_root = tmp_path / "out"
+	download_root.mkdir()
+	db = SqliteHashDB(tmp_path / "hashdb.sqlite3", tmp_path / "removed.jsonl")
+	db.set({"sha256": "aaa", "filepath": "out/foo.png"})
+	db.set({"sha256": "bbb", "filepath": str(download_root / "bar.png")})
+	db.set({"sha256": "ccc"})
+
+	removed = db.delete_by_filepaths([download_root / "foo.png"])
+
+	assert [entry["sha256"] for entry in removed] == ["aaa"]
+	assert db.get("aaa") is None
+	assert db.get("bbb") is not None
+	assert db.get("ccc") is not None
+	db.close()
+
+
+def test_log_removed_appends_jsonl(tmp_path):
+	removed_path = tmp_path / "removed.jsonl"
+	db = SqliteHashDB(tmp_path / "hashdb.sqlite3", removed_path)
+
+	db.log_removed({"sha256": "aaa", "reason": "duplicate"})
+	db.flush()
+
+	assert '"reason"' in removed_path.read_text(encoding="utf-8")
+	db.close()
+
+
+def test_close_writes_pending_removed_records(tmp_path):
+	removed_path = tmp_path / "removed.jsonl"
+	db = SqliteHashDB(tmp_path / "hashdb.sqlite3", removed_path)
+
+	for sha in ("aaa", "bbb"):
+		db.log_removed({"sha256": sha, "reason": "duplicate"})
+	db.close()
+
+	lines = removed_path.read_text(encoding="utf-8").splitlines()
+	assert [json.loads(line)["sha256"] for line in lines] == ["aaa", "bbb"]
+
+
+def test_open_hashdb_selects_backend(tmp_path):
+	cfg = GlobalConfig()
+	cfg.paths.hashdb_file = tmp_path / "hashdb.db"
+	cfg.paths.removed_log_file = tmp_path / "removed.jsonl"
+
+	assert isinstance(open_hashdb(cfg), JsonlHashDB)
+
+	cfg.hashdb.backend = "sqlite"
+	db = open_hashdb(cfg)
+	assert isinstance(db, SqliteHashDB)
+	db.close()
@@ -2,20 +2,35 @@ from datetime import datetime, timezone, timedelta
 
 import pytest
 
-from util import parse_time
+from util import media_url, parse_time
 
 
-def test_parse_time_handles_z_suffix():
-	result = parse_time("2023-01-01T12:34:56Z")
-	assert result == datetime(2023, 1, 1, 12, 34, 56, tzinfo=timezone.utc)
+@pytest.mark.parametrize(
+	"value,expected",
+	[
+		("2023-01-01T12:34:56Z", datetime(2023, 1, 1, 12, 34, 56, tzinfo=timezone.utc)),
+		("2023-01-01T09:00:00+09:00", datetime(2023, 1, 1, 9, tzinfo=timezone(timedelta(hours=9)))),
+	],
+	ids=["z_suffix", "offset"],
+)
+def test_parse_time(value, expected):
+	result = parse_time(value)
+	assert result == expected
+	# == compares instants; the offset itself must be preserved too
+	assert result.utcoffset() == expected.utcoffset()
 
 
-def test_parse_time_preserves_timezone_offset():
-	result = parse_time("2023-01-01T09:00:00+09:00")
-	assert result.hour == 9
-	assert result.utcoffset() == timedelta(hours=9)
+def test_parse_time_reuses_parsed_values():
+	first = parse_time("2023-01-01T12:34:56Z")
+	assert parse_time("2023-01-01T12:34:56Z") is first
 
 
 def test_parse_time_rejects_empty_string():
 	with pytest.raises(ValueError):
 		parse_time("")
+
+
+def test_media_url_prefers_remote_url():
+	assert media_url({"remote_url": "https://remote/a.png", "url": "https://local/a.png"}) == "https://remote/a.png"
+	assert media_url({"remote_url": None, "url": "https://local/a.png"}) == "https://local/a.png"
+	assert media_url({}) is None